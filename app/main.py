@@ -120,6 +120,10 @@ async def shutdown_cleanup():
     await ollama_service.close()
     await openrouter_service.close()
 
+    # Close the shared Chromium used for image/video generation
+    from app.services.gradio_automation import cleanup_shared_browsers
+    await cleanup_shared_browsers()
+
     # Clean up voice services if enabled
     if config.VOICE_ENABLED:
         from app.services.tts_service import cleanup_tts_service
@@ -255,6 +255,9 @@ async def update_feature(
     if not feature:
         raise HTTPException(status_code=404, detail="Feature not found")
 
+    # Refresh the in-process defaults snapshot used for feature checks
+    get_feature_service().reload_defaults()
+
     return feature
 
 
@@ -453,7 +453,12 @@ async def chat(request: Request, user: UserResponse = Depends(require_auth)):
             logger.info(f"Processing {len(chat_request.files)} attached files")
             for f in chat_request.files:
                 logger.debug(f"File: {f.name}, type: {f.type}, content_len: {len(f.content) if f.content else 0}")
-            file_context = file_processor.format_files_for_context(
+            # PDF/ZIP extraction is CPU-bound; run it off the event loop so
+            # other streams keep flowing while attachments are parsed
+            loop = asyncio.get_running_loop()
+            file_context = await loop.run_in_executor(
+                None,
+                file_processor.format_files_for_context,
                 [f.model_dump() for f in chat_request.files]
             )
             logger.debug(f"File context length: {len(file_context) if file_context else 0}")
@@ -177,6 +177,7 @@ class DatabaseService:
             ("010_add_full_unlock_columns", self._migration_010_add_full_unlock_columns),
             ("011_add_voice_settings", self._migration_011_add_voice_settings),
             ("012_admin_features", self._migration_012_admin_features),
+            ("013_feature_override_covering_index", self._migration_013_feature_override_covering_index),
         ]
 
         # Run pending migrations
@@ -586,6 +587,20 @@ class DatabaseService:
         self.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_admin ON admin_audit_log(admin_id)")
         self.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_created ON admin_audit_log(created_at)")
 
+    def _migration_013_feature_override_covering_index(self):
+        """Add a covering index for per-user feature override lookups.
+
+        Feature checks read (feature_key, enabled) for a user, optionally filtered
+        by feature_key. Indexing (user_id, feature_key, enabled) answers both
+        queries from the index alone. It also covers user_id-only lookups, so the
+        single-column idx_feature_overrides_user index is dropped.
+        """
+        self.execute("""
+            CREATE INDEX IF NOT EXISTS idx_feature_overrides_user_key_enabled
+            ON user_feature_overrides(user_id, feature_key, enabled)
+        """)
+        self.execute("DROP INDEX IF EXISTS idx_feature_overrides_user")
+
     def close(self):
         """Close the database connection"""
         if hasattr(_local, 'connection') and _local.connection is not None:
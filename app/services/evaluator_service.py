@@ -1,79 +1,145 @@
 """Evaluator service for satisfaction/trust scoring based on interaction events."""
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+import threading
+import time
+from collections import Counter
+from types import MappingProxyType
+from typing import Dict, Any, Final, Mapping, Optional, List, Tuple
 from app.services.user_profile_store import get_user_profile_store
 
 logger = logging.getLogger(__name__)
 
+# Per-second cache for the UTC ISO timestamp written on every evaluation
+_last_timestamp_second = -1
+_last_timestamp = ""
+_timestamp_lock = threading.Lock()
+
+
+def _utc_now_iso() -> str:
+    """Return the current UTC time as an ISO 8601 string with a Z suffix.
+
+    Formatting is done at most once per wall-clock second; calls within the
+    same second reuse the cached string.
+    """
+    global _last_timestamp_second, _last_timestamp
+    second = int(time.time())
+    if second != _last_timestamp_second:
+        with _timestamp_lock:
+            if second != _last_timestamp_second:
+                _last_timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(second))
+                _last_timestamp_second = second
+    return _last_timestamp
+
+
+def _compile_score_table(
+    satisfaction_scores: Mapping[str, int],
+    trust_scores: Mapping[str, int],
+    multiplier: float = 1.0
+) -> Dict[str, Tuple[float, float]]:
+    """Build an event_type -> (satisfaction, trust) table scaled by a severity multiplier."""
+    return {
+        event_type: (
+            satisfaction_scores.get(event_type, 0) * multiplier,
+            trust_scores.get(event_type, 0) * multiplier,
+        )
+        for event_type in satisfaction_scores.keys() | trust_scores.keys()
+    }
+
+
+def _compile_severity_tables(
+    satisfaction_scores: Mapping[str, int],
+    trust_scores: Mapping[str, int],
+    multipliers: Mapping[str, float]
+) -> Dict[str, Dict[str, Tuple[float, float]]]:
+    """Build a severity -> event_type -> (satisfaction, trust) table."""
+    return {
+        severity: _compile_score_table(satisfaction_scores, trust_scores, multiplier)
+        for severity, multiplier in multipliers.items()
+    }
+
+
+# Satisfaction score adjustments
+SATISFACTION_SCORES: Final[Mapping[str, int]] = MappingProxyType({
+    "praise": 5,
+    "explicit_thanks": 3,
+    "task_completed": 3,
+    "correction_accepted": 2,
+    "preference_remembered": 2,
+    "helpful_suggestion_accepted": 2,
+    "humor_landed": 2,
+    "emotional_support_appreciated": 3,
+    "boundary_respected": 2,
+    "frustration": -5,
+    "task_failed": -5,
+    "had_to_repeat": -3,
+    "preference_ignored": -5,
+    "guardrail_complaint": -10,
+    "lie_caught": -15,
+    "boundary_violated": -20,
+    "persona_break": -8,
+    "tone_mismatch": -3,
+    "over_explained": -2,
+    "under_explained": -3,
+    "unsolicited_advice_unwanted": -3,
+    "missed_context": -4,
+})
+
+# Trust score adjustments
+TRUST_SCORES: Final[Mapping[str, int]] = MappingProxyType({
+    "sensitive_info_shared": 5,
+    "permission_granted": 3,
+    "correction_accepted": 1,
+    "lie_caught": -25,
+    "boundary_violated": -30,
+})
+
+# Severity multipliers
+SEVERITY_MULTIPLIERS: Final[Mapping[str, float]] = MappingProxyType({
+    "minor": 0.5,
+    "moderate": 1.0,
+    "major": 1.5,
+})
+
+# Combined (satisfaction, trust) score pairs pre-multiplied by each severity,
+# so scoring an event is a single lookup instead of separate satisfaction/trust
+# lookups and multiplies. Unknown severities use the unscaled table (1.0).
+_SCORE_TABLE = _compile_score_table(SATISFACTION_SCORES, TRUST_SCORES)
+_SCALED_SCORE_TABLES = _compile_severity_tables(SATISFACTION_SCORES, TRUST_SCORES, SEVERITY_MULTIPLIERS)
+
 
 class EvaluatorService:
     """Evaluates user interactions and updates relationship metrics."""
 
     EVALUATION_INTERVAL = 10  # Evaluate every N messages
 
-    # Satisfaction score adjustments
-    SATISFACTION_SCORES = {
-        "praise": 5,
-        "explicit_thanks": 3,
-        "task_completed": 3,
-        "correction_accepted": 2,
-        "preference_remembered": 2,
-        "helpful_suggestion_accepted": 2,
-        "humor_landed": 2,
-        "emotional_support_appreciated": 3,
-        "boundary_respected": 2,
-        "frustration": -5,
-        "task_failed": -5,
-        "had_to_repeat": -3,
-        "preference_ignored": -5,
-        "guardrail_complaint": -10,
-        "lie_caught": -15,
-        "boundary_violated": -20,
-        "persona_break": -8,
-        "tone_mismatch": -3,
-        "over_explained": -2,
-        "under_explained": -3,
-        "unsolicited_advice_unwanted": -3,
-        "missed_context": -4,
-    }
-
-    # Trust score adjustments
-    TRUST_SCORES = {
-        "sensitive_info_shared": 5,
-        "permission_granted": 3,
-        "correction_accepted": 1,
-        "lie_caught": -25,
-        "boundary_violated": -30,
-    }
+    # Score tables (module-level read-only mappings, exposed here for callers)
+    SATISFACTION_SCORES = SATISFACTION_SCORES
+    TRUST_SCORES = TRUST_SCORES
+    SEVERITY_MULTIPLIERS = SEVERITY_MULTIPLIERS
 
-    # Severity multipliers
-    SEVERITY_MULTIPLIERS = {
-        "minor": 0.5,
-        "moderate": 1.0,
-        "major": 1.5,
-    }
+    # Event types that count as trust violations when logged as major
+    TRUST_VIOLATIONS = frozenset({"lie_caught", "boundary_violated"})
 
-    # Stage transition thresholds
-    STAGE_THRESHOLDS = {
-        "new": {"min_interactions": 0, "max_interactions": 10, "min_trust": 0},
-        "familiar": {"min_interactions": 11, "max_interactions": 50, "min_trust": 30},
-        "established": {"min_interactions": 51, "max_interactions": 200, "min_trust": 50},
-        "deep": {"min_interactions": 201, "max_interactions": float('inf'), "min_trust": 70},
-    }
+    # Stage transition thresholds, highest stage first:
+    # (stage, min_interactions, max_interactions, min_trust)
+    STAGE_THRESHOLDS = (
+        ("deep", 201, float('inf'), 70),
+        ("established", 51, 200, 50),
+        ("familiar", 11, 50, 30),
+        ("new", 0, 10, 0),
+    )
 
     def __init__(self):
         self.store = get_user_profile_store()
-        self._interaction_counts: Dict[int, int] = {}  # user_id -> message count since last eval
+        self._interaction_counts: Counter = Counter()  # user_id -> message count since last eval
 
     def increment_interaction(self, user_id: int):
         """Increment interaction count for a user."""
-        self._interaction_counts[user_id] = self._interaction_counts.get(user_id, 0) + 1
+        self._interaction_counts[user_id] += 1
 
     async def should_evaluate(self, user_id: int) -> bool:
         """Check if evaluation should run based on message count."""
-        count = self._interaction_counts.get(user_id, 0)
-        return count >= self.EVALUATION_INTERVAL
+        return self._interaction_counts[user_id] >= self.EVALUATION_INTERVAL
 
     async def evaluate(self, user_id: int) -> Dict[str, Any]:
         """Perform evaluation and update metrics."""
@@ -95,8 +161,7 @@ class EvaluatorService:
         current_stage = metrics.get("relationship_stage", "new")
 
         # Calculate deltas
-        satisfaction_delta = self._calculate_satisfaction_delta(events)
-        trust_delta = self._calculate_trust_delta(events)
+        satisfaction_delta, trust_delta = self._calculate_deltas(events)
 
         # Apply bounds (0-100), trust capped at +10 per session
         trust_delta = min(trust_delta, 10)  # Max trust gain per session
@@ -131,7 +196,7 @@ class EvaluatorService:
         )
 
         # Build updates
-        now = datetime.utcnow().isoformat() + "Z"
+        now = _utc_now_iso()
         updates = {
             "relationship_metrics.satisfaction_level": int(new_satisfaction),
             "relationship_metrics.trust_level": int(new_trust),
@@ -145,9 +210,8 @@ class EvaluatorService:
             "interaction_log.pending_evaluation": False,
         }
 
-        # Apply updates
-        for path, value in updates.items():
-            self.store.patch_profile_field(user_id, path, value, "set")
+        # Apply updates to the profile already loaded above in one write
+        self.store.set_profile_fields(user_id, updates, profile=profile)
 
         # Reset interaction count
         self._interaction_counts[user_id] = 0
@@ -167,31 +231,29 @@ class EvaluatorService:
             "new_stage": new_stage,
         }
 
-    def _calculate_satisfaction_delta(self, events: List[Dict[str, Any]]) -> float:
-        """Calculate satisfaction score change from events."""
-        delta = 0.0
-        for event in events:
-            event_type = event.get("event_type", "")
-            severity = event.get("severity", "moderate")
-
-            base_score = self.SATISFACTION_SCORES.get(event_type, 0)
-            multiplier = self.SEVERITY_MULTIPLIERS.get(severity, 1.0)
-            delta += base_score * multiplier
-
-        return delta
-
-    def _calculate_trust_delta(self, events: List[Dict[str, Any]]) -> float:
-        """Calculate trust score change from events."""
-        delta = 0.0
+    def _calculate_deltas(
+        self,
+        events: List[Dict[str, Any]],
+        _scaled_tables: Dict[str, Dict[str, Tuple[float, float]]] = _SCALED_SCORE_TABLES,
+        _default_table: Dict[str, Tuple[float, float]] = _SCORE_TABLE
+    ) -> Tuple[float, float]:
+        """Calculate satisfaction and trust score changes from events in one pass.
+
+        The score tables are bound as default arguments so the loop reads them
+        as locals rather than through attribute lookups.
+        """
+        satisfaction_delta = 0.0
+        trust_delta = 0.0
         for event in events:
             event_type = event.get("event_type", "")
             severity = event.get("severity", "moderate")
 
-            base_score = self.TRUST_SCORES.get(event_type, 0)
-            multiplier = self.SEVERITY_MULTIPLIERS.get(severity, 1.0)
-            delta += base_score * multiplier
+            scores = _scaled_tables.get(severity, _default_table).get(event_type)
+            if scores is not None:
+                satisfaction_delta += scores[0]
+                trust_delta += scores[1]
 
-        return delta
+        return satisfaction_delta, trust_delta
 
     def _determine_session_polarity(self, satisfaction_delta: float) -> str:
         """Determine if session was positive, negative, or neutral."""
@@ -208,13 +270,8 @@ class EvaluatorService:
         current_stage: str
     ) -> str:
         """Check if relationship stage should change."""
-        # Order stages from highest to lowest
-        stages = ["deep", "established", "familiar", "new"]
-
-        for stage in stages:
-            thresholds = self.STAGE_THRESHOLDS[stage]
-            if (thresholds["min_interactions"] <= interaction_count <= thresholds["max_interactions"]
-                and trust_level >= thresholds["min_trust"]):
+        for stage, min_interactions, max_interactions, min_trust in self.STAGE_THRESHOLDS:
+            if min_interactions <= interaction_count <= max_interactions and trust_level >= min_trust:
                 return stage
 
         return current_stage
@@ -235,15 +292,32 @@ class EvaluatorService:
         if not events:
             return "No events logged this session."
 
-        # Event summary
-        event_types = [e.get("event_type", "") for e in events]
-        positive_events = [e for e in event_types if self.SATISFACTION_SCORES.get(e, 0) > 0]
-        negative_events = [e for e in event_types if self.SATISFACTION_SCORES.get(e, 0) < 0]
+        # Fast path: nothing to report when no event carries a satisfaction
+        # score (which also rules out trust violations) and the session is
+        # otherwise unremarkable
+        if (session_polarity == "neutral" and not stage_changed and new_satisfaction >= 20
+                and not any(e.get("event_type", "") in self.SATISFACTION_SCORES for e in events)):
+            return "Standard evaluation complete."
+
+        # Classify events in a single pass
+        positive_events = set()
+        negative_events = set()
+        has_major_violation = False
+        for event in events:
+            event_type = event.get("event_type", "")
+            score = self.SATISFACTION_SCORES.get(event_type, 0)
+            if score > 0:
+                positive_events.add(event_type)
+            elif score < 0:
+                negative_events.add(event_type)
+            if event.get("severity") == "major" and event_type in self.TRUST_VIOLATIONS:
+                has_major_violation = True
 
+        # Event summary
         if positive_events:
-            notes.append(f"Positive: {', '.join(set(positive_events))}")
+            notes.append(f"Positive: {', '.join(positive_events)}")
         if negative_events:
-            notes.append(f"Negative: {', '.join(set(negative_events))}")
+            notes.append(f"Negative: {', '.join(negative_events)}")
 
         # Session summary
         if session_polarity == "positive":
@@ -260,9 +334,7 @@ class EvaluatorService:
             notes.append(f"Stage changed to: {new_stage}")
 
         # Major violations
-        major_violations = [e for e in events if e.get("severity") == "major"
-                          and e.get("event_type") in ["lie_caught", "boundary_violated"]]
-        if major_violations:
+        if has_major_violation:
             notes.append("Major trust violation detected. Recovery protocol recommended.")
 
         return " ".join(notes) if notes else "Standard evaluation complete."
@@ -1,6 +1,6 @@
 """Feature service for checking feature flags and gating tools."""
 import logging
-from typing import Optional, Set, List
+from typing import Optional, Set, List, Dict
 from app.services.database import get_database
 
 logger = logging.getLogger(__name__)
@@ -26,6 +26,20 @@ class FeatureService:
 
     def __init__(self):
         self.db = get_database()
+        self._defaults: Dict[str, bool] = {}
+        self.reload_defaults()
+
+    def reload_defaults(self):
+        """Reload the global feature flag defaults from the database.
+
+        feature_flags rarely changes, so defaults are snapshotted in-process and
+        only per-user overrides are queried per call. Must be called after any
+        admin mutation of feature_flags.
+        """
+        rows = self.db.fetchall("""
+            SELECT feature_key, default_enabled FROM feature_flags
+        """)
+        self._defaults = {row["feature_key"]: bool(row["default_enabled"]) for row in rows}
 
     def is_feature_enabled(self, feature_key: str, user_id: int) -> bool:
         """Check if a specific feature is enabled for a user.
@@ -49,12 +63,8 @@ class FeatureService:
             return bool(override["enabled"])
 
         # Fall back to global default
-        feature = self.db.fetchone("""
-            SELECT default_enabled FROM feature_flags WHERE feature_key = ?
-        """, (feature_key,))
-
-        if feature:
-            return bool(feature["default_enabled"])
+        if feature_key in self._defaults:
+            return self._defaults[feature_key]
 
         # If feature not in database, default to enabled
         logger.warning(f"Feature {feature_key} not found in database, defaulting to enabled")
@@ -69,28 +79,18 @@ class FeatureService:
         Returns:
             Set of enabled feature keys
         """
-        # Get all features with defaults
-        features = self.db.fetchall("""
-            SELECT feature_key, default_enabled FROM feature_flags
-        """)
+        # Start from global defaults
+        effective = self._defaults.copy()
 
-        # Get user overrides
+        # Apply user overrides for known features
         overrides = self.db.fetchall("""
             SELECT feature_key, enabled FROM user_feature_overrides WHERE user_id = ?
         """, (user_id,))
-        override_map = {row["feature_key"]: bool(row["enabled"]) for row in overrides}
-
-        enabled = set()
-        for feature in features:
-            key = feature["feature_key"]
-            # Use override if exists, otherwise use default
-            if key in override_map:
-                if override_map[key]:
-                    enabled.add(key)
-            elif feature["default_enabled"]:
-                enabled.add(key)
+        for row in overrides:
+            if row["feature_key"] in effective:
+                effective[row["feature_key"]] = bool(row["enabled"])
 
-        return enabled
+        return {key for key, enabled in effective.items() if enabled}
 
     def get_available_tools(self, user_id: int) -> Set[str]:
         """Get the set of tool names available to a user based on their features.
@@ -104,8 +104,11 @@ class FeatureService:
         Returns:
             Set of available tool names
         """
-        enabled_features = self.get_enabled_features(user_id)
+        return self._tools_for_features(self.get_enabled_features(user_id))
 
+    @staticmethod
+    def _tools_for_features(enabled_features: Set[str]) -> Set[str]:
+        """Resolve the gated tool names unlocked by a set of enabled features."""
         # Check if tool_use is enabled at all
         if "tool_use" not in enabled_features:
             return set()
@@ -142,22 +145,20 @@ class FeatureService:
             logger.debug(f"Tool use disabled for user {user_id}")
             return []
 
-        available_tools = self.get_available_tools(user_id)
-
-        filtered = []
-        for tool in tools:
-            tool_name = tool.get("function", {}).get("name", "")
+        # Reuse the feature set fetched above rather than querying again
+        available_tools = self._tools_for_features(enabled_features)
 
-            # If tool is not gated, always include it
-            if tool_name not in GATED_TOOLS:
-                filtered.append(tool)
-                continue
+        # Ungated tools always pass, so only gated tools that aren't available are blocked
+        blocked_tools = GATED_TOOLS - available_tools
+        if not blocked_tools:
+            return tools
 
-            # If tool is gated, check if it's available
-            if tool_name in available_tools:
-                filtered.append(tool)
-            else:
-                logger.debug(f"Tool {tool_name} filtered out for user {user_id}")
+        filtered = [
+            tool for tool in tools
+            if tool.get("function", {}).get("name", "") not in blocked_tools
+        ]
+        if len(filtered) != len(tools):
+            logger.debug(f"Filtered out {len(tools) - len(filtered)} tools for user {user_id}")
 
         return filtered
 
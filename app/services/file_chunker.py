@@ -2,10 +2,17 @@ import logging
 from typing import List, Tuple
 import re
 
+import numpy as np
+
 from app.config import KB_CHUNK_SIZE, KB_CHUNK_OVERLAP
 
 logger = logging.getLogger(__name__)
 
+# Precompiled patterns shared by all chunker instances
+_PARA_SPLIT = re.compile(r'\n\s*\n')
+_MD_HEADER_SPLIT = re.compile(r'(^#{1,6}\s+.+$)', re.MULTILINE)
+_MD_HEADER_MATCH = re.compile(r'^#{1,6}\s+')
+
 
 class FileChunker:
     """Service for chunking text documents into smaller pieces"""
@@ -33,85 +40,91 @@ class FileChunker:
             return self._chunk_plain_text(text)
 
     def _chunk_plain_text(self, text: str) -> List[Tuple[int, str]]:
-        """Chunk plain text by paragraphs/sentences"""
-        # Split into paragraphs first
-        paragraphs = re.split(r'\n\s*\n', text)
+        """
+        Chunk plain text by paragraphs.
+
+        Chunks are tracked as [start, end) ranges over the paragraph list and
+        joined once when emitted, keeping the per-paragraph loop body to an
+        add and a compare.
+        """
+        # Split into paragraphs first, stripping and dropping blanks at C level
+        paragraphs = [para for para in map(str.strip, _PARA_SPLIT.split(text)) if para]
+        sizes = list(map(len, paragraphs))
+        chunk_size = self.chunk_size
+        keep_overlap = self.chunk_overlap > 0
         chunks = []
-        current_chunk = []
-        current_size = 0
         chunk_index = 0
+        start = 0
+        current_size = 0
 
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-
-            para_size = len(para)
-
-            if current_size + para_size > self.chunk_size and current_chunk:
+        for i, para_size in enumerate(sizes):
+            if current_size + para_size > chunk_size and i > start:
                 # Save current chunk
-                chunk_text = '\n\n'.join(current_chunk)
-                chunks.append((chunk_index, chunk_text))
+                chunks.append((chunk_index, '\n\n'.join(paragraphs[start:i])))
                 chunk_index += 1
 
-                # Start new chunk with overlap
-                if self.chunk_overlap > 0 and len(current_chunk) > 0:
-                    overlap_text = current_chunk[-1]
-                    current_chunk = [overlap_text]
-                    current_size = len(overlap_text)
+                # Start new chunk with the last paragraph as overlap
+                if keep_overlap:
+                    start = i - 1
+                    current_size = sizes[start]
                 else:
-                    current_chunk = []
+                    start = i
                     current_size = 0
 
-            current_chunk.append(para)
             current_size += para_size
 
         # Don't forget the last chunk
-        if current_chunk:
-            chunk_text = '\n\n'.join(current_chunk)
-            chunks.append((chunk_index, chunk_text))
+        if paragraphs:
+            chunks.append((chunk_index, '\n\n'.join(paragraphs[start:])))
 
         return chunks
 
     def _chunk_code(self, text: str) -> List[Tuple[int, str]]:
         """
-        Chunk code by logical blocks (functions, classes).
-        Falls back to line-based chunking if needed.
+        Chunk code by line boundaries with line-based overlap.
+
+        Line sizes are prefix-summed once so each chunk boundary is found with
+        a binary search instead of walking the file line by line in Python.
         """
         lines = text.split('\n')
+        num_lines = len(lines)
+        # Cumulative size through each line, +1 per line for the newline
+        cumulative = np.cumsum(
+            np.fromiter((len(line) + 1 for line in lines), dtype=np.int64, count=num_lines)
+        )
+
+        # Calculate overlap in lines
+        overlap_lines = max(1, self.chunk_overlap // 50)  # ~50 chars per line avg
+
         chunks = []
-        current_chunk = []
-        current_size = 0
         chunk_index = 0
+        start = 0
+        prev_end = 0
 
-        for line in lines:
-            line_size = len(line) + 1  # +1 for newline
+        while True:
+            base = int(cumulative[start - 1]) if start else 0
+            # First line that would push the chunk past chunk_size; the line
+            # after the previous boundary is always included
+            end = int(np.searchsorted(cumulative, base + self.chunk_size, side='right'))
+            end = max(end, prev_end + 1)
 
-            if current_size + line_size > self.chunk_size and current_chunk:
-                # Save current chunk
-                chunk_text = '\n'.join(current_chunk)
-                chunks.append((chunk_index, chunk_text))
-                chunk_index += 1
-
-                # Calculate overlap in lines
-                overlap_lines = max(1, self.chunk_overlap // 50)  # ~50 chars per line avg
-                current_chunk = current_chunk[-overlap_lines:]
-                current_size = sum(len(l) + 1 for l in current_chunk)
+            if end >= num_lines:
+                chunks.append((chunk_index, '\n'.join(lines[start:])))
+                break
 
-            current_chunk.append(line)
-            current_size += line_size
+            chunks.append((chunk_index, '\n'.join(lines[start:end])))
+            chunk_index += 1
 
-        # Last chunk
-        if current_chunk:
-            chunk_text = '\n'.join(current_chunk)
-            chunks.append((chunk_index, chunk_text))
+            # Start the next chunk with the trailing overlap lines
+            start = max(start, end - overlap_lines)
+            prev_end = end
 
         return chunks
 
     def _chunk_markdown(self, text: str) -> List[Tuple[int, str]]:
         """Chunk markdown by headers and sections"""
         # Split by headers
-        sections = re.split(r'(^#{1,6}\s+.+$)', text, flags=re.MULTILINE)
+        sections = _MD_HEADER_SPLIT.split(text)
 
         chunks = []
         current_chunk = []
@@ -124,7 +137,7 @@ class FileChunker:
                 continue
 
             # Check if this is a header
-            if re.match(r'^#{1,6}\s+', section):
+            if _MD_HEADER_MATCH.match(section):
                 current_header = section.strip()
                 continue
 
@@ -154,17 +167,22 @@ class FileChunker:
         """Extract text from PDF bytes"""
         try:
             from pypdf import PdfReader
-            from io import BytesIO
+            from io import BytesIO, StringIO
 
             reader = PdfReader(BytesIO(pdf_content))
-            text_parts = []
+            # Write pages straight into one buffer rather than holding a list
+            # of page strings alongside the joined result
+            buf = StringIO()
 
             for page in reader.pages:
                 text = page.extract_text()
-                if text:
-                    text_parts.append(text)
+                if not text:
+                    continue
+                if buf.tell():
+                    buf.write('\n\n')
+                buf.write(text)
 
-            return '\n\n'.join(text_parts)
+            return buf.getvalue()
 
         except Exception as e:
             logger.error(f"PDF extraction failed: {e}")
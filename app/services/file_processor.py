@@ -2,11 +2,17 @@
 
 import base64
 import binascii
+import hashlib
 import zipfile
 import io
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 
+from cachetools import LRUCache
+
 logger = logging.getLogger(__name__)
 
 # Try to import pypdf, fall back gracefully if not installed
@@ -17,6 +23,58 @@ except ImportError:
     PDF_SUPPORT = False
     logger.warning("pypdf not installed. PDF text extraction will be limited.")
 
+# Prefer pybase64 (SIMD-accelerated) for decoding uploads, fall back to stdlib.
+# Both raise binascii.Error on invalid input with validate=True.
+try:
+    import pybase64
+    _b64decode = pybase64.b64decode
+except ImportError:
+    _b64decode = base64.b64decode
+
+# Whitespace that MIME-wrapped base64 may contain but validate=True rejects
+_B64_WHITESPACE = '\r\n\t '
+_WS_TRANS = str.maketrans('', '', _B64_WHITESPACE)
+_WS_BYTES = _B64_WHITESPACE.encode('ascii')
+
+
+def _strip_base64(content_b64):
+    """Drop any data URL prefix and embedded whitespace from a base64 payload."""
+    if isinstance(content_b64, str):
+        return content_b64.split(',', 1)[-1].translate(_WS_TRANS)
+    if isinstance(content_b64, (bytes, bytearray)):
+        return content_b64.split(b',', 1)[-1].translate(None, _WS_BYTES)
+    return content_b64
+
+
+# Appended to extracted text that was cut at MAX_TEXT_LENGTH
+_TRUNCATION_NOTICE = "\n\n[... content truncated ...]"
+
+# Extensions of ZIP members whose text is extracted into the context
+_TEXT_EXTENSIONS = frozenset({
+    'txt', 'md', 'json', 'xml', 'csv', 'py', 'js', 'ts',
+    'html', 'css', 'java', 'c', 'cpp', 'h', 'go', 'rs',
+    'rb', 'php', 'sh', 'yaml', 'yml', 'toml', 'ini', 'cfg',
+})
+
+# Processed-file cache configuration
+PROCESSED_CACHE_MAX_ENTRIES = 64  # Each entry holds up to ~MAX_TEXT_LENGTH chars
+
+# Processed PDF/ZIP results keyed by (type, name, payload digest) so that
+# re-sending the same upload skips both the base64 decode and the extraction
+_processed_cache: LRUCache = LRUCache(maxsize=PROCESSED_CACHE_MAX_ENTRIES)
+# Files are processed from worker threads; LRUCache reorders on every get
+_processed_cache_lock = threading.Lock()
+
+# Upper bound on files processed in parallel for one message
+MAX_FILE_WORKERS = 4
+
+
+def _payload_digest(content) -> bytes:
+    """Fast fingerprint of an upload payload for cache keys."""
+    if isinstance(content, str):
+        content = content.encode('utf-8', errors='surrogatepass')
+    return hashlib.blake2b(content, digest_size=16).digest()
+
 
 class FileProcessor:
     """Process various file types for inclusion in chat context."""
@@ -24,6 +82,12 @@ class FileProcessor:
     # Maximum characters to extract from a file
     MAX_TEXT_LENGTH = 50000
 
+    # Maximum characters to extract from each text file inside a ZIP
+    MAX_ZIP_MEMBER_CHARS = 10000
+
+    # Maximum decoded size of a base64 PDF/ZIP upload (the UI caps files at 25 MB)
+    MAX_DECODED_SIZE = 64 * 1024 * 1024
+
     def process_file(self, file_data: Dict) -> Dict:
         """
         Process a file and extract its content.
@@ -39,13 +103,14 @@ class FileProcessor:
         is_base64 = file_data.get('is_base64', False)
         name = file_data.get('name', 'unknown')
 
-        logger.debug(f"Processing file: {name}, type: {file_type}, is_base64: {is_base64}, content_length: {len(content) if content else 0}")
+        logger.debug(
+            "Processing file: %s, type: %s, is_base64: %s, content_length: %d",
+            name, file_type, is_base64, len(content) if content else 0
+        )
 
         try:
-            if file_type == 'pdf':
-                return self._process_pdf(name, content)
-            elif file_type == 'zip':
-                return self._process_zip(name, content)
+            if file_type in ('pdf', 'zip'):
+                return self._process_binary_cached(name, content, file_type)
             else:
                 # Text or code file
                 return self._process_text(name, content, file_type)
@@ -57,9 +122,41 @@ class FileProcessor:
                 'content': f"[Error processing file: {e}]"
             }
 
+    def _process_binary_cached(self, name: str, content_b64: str, file_type: str) -> Dict:
+        """Process a base64 PDF/ZIP upload, reusing the result for identical payloads."""
+        # Base64 decodes to at most 3 bytes per 4 chars, so oversized uploads
+        # are rejected before hashing, decoding or parsing any of the payload
+        if len(content_b64) * 3 // 4 > self.MAX_DECODED_SIZE:
+            limit_mb = self.MAX_DECODED_SIZE // (1024 * 1024)
+            logger.warning(f"Rejected oversized {file_type.upper()} upload {name}: {len(content_b64)} base64 chars")
+            return {
+                'name': name,
+                'type': file_type,
+                'error': 'File too large',
+                'content': f"[Error: File exceeds the {limit_mb} MB limit.]"
+            }
+
+        cache_key = (file_type, name, _payload_digest(content_b64))
+        with _processed_cache_lock:
+            cached = _processed_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Processed file cache hit for %s", name)
+            return dict(cached)
+
+        if file_type == 'pdf':
+            processed = self._process_pdf(name, content_b64)
+        else:
+            processed = self._process_zip(name, content_b64)
+
+        # Only successful results are cached so a failed upload can be retried
+        if 'error' not in processed:
+            with _processed_cache_lock:
+                _processed_cache[cache_key] = processed
+        return dict(processed)
+
     def _process_pdf(self, name: str, content_b64: str) -> Dict:
         """Extract text from PDF file."""
-        logger.debug(f"_process_pdf called for: {name}, PDF_SUPPORT: {PDF_SUPPORT}")
+        logger.debug("_process_pdf called for: %s, PDF_SUPPORT: %s", name, PDF_SUPPORT)
 
         if not PDF_SUPPORT:
             return {
@@ -70,11 +167,12 @@ class FileProcessor:
             }
 
         try:
-            logger.debug(f"Decoding base64 PDF, length: {len(content_b64)}")
+            logger.debug("Decoding base64 PDF, length: %d", len(content_b64))
 
-            # Validate and decode base64
+            # Validate and decode base64. The stripped copy is a temporary so
+            # it is freed before parsing rather than held alongside the bytes
             try:
-                pdf_bytes = base64.b64decode(content_b64, validate=True)
+                pdf_bytes = _b64decode(_strip_base64(content_b64), validate=True)
             except binascii.Error as e:
                 logger.warning(f"Invalid base64 encoding for PDF {name}: {e}")
                 return {
@@ -84,33 +182,43 @@ class FileProcessor:
                     'content': '[Error: Invalid base64 encoding. Please re-upload the file.]'
                 }
 
-            logger.debug(f"Decoded PDF to {len(pdf_bytes)} bytes")
+            logger.debug("Decoded PDF to %d bytes", len(pdf_bytes))
+            # BytesIO shares the bytes object's buffer until written to, so
+            # this does not copy the decoded PDF
             pdf_file = io.BytesIO(pdf_bytes)
             reader = PdfReader(pdf_file)
-            logger.debug(f"PDF {name} has {len(reader.pages)} pages")
+            num_pages = len(reader.pages)
+            logger.debug("PDF %s has %d pages", name, num_pages)
 
             text_parts = []
+            text_length = 0
             for i, page in enumerate(reader.pages):
                 page_text = page.extract_text()
-                logger.debug(f"PDF page {i+1}: {len(page_text) if page_text else 0} chars")
+                logger.debug("PDF page %d: %d chars", i + 1, len(page_text) if page_text else 0)
                 if page_text:
-                    text_parts.append(f"--- Page {i + 1} ---\n{page_text}")
+                    part = f"--- Page {i + 1} ---\n{page_text}"
+                    text_parts.append(part)
+                    # Length of the joined text so far, including separators
+                    text_length += len(part) + (2 if len(text_parts) > 1 else 0)
+                    # Later pages would be cut by the truncation below anyway
+                    if text_length > self.MAX_TEXT_LENGTH:
+                        break
 
             full_text = "\n\n".join(text_parts)
-            logger.debug(f"Total extracted PDF text: {len(full_text)} chars")
+            logger.debug("Total extracted PDF text: %d chars", len(full_text))
 
             # Truncate if too long
             if len(full_text) > self.MAX_TEXT_LENGTH:
-                full_text = full_text[:self.MAX_TEXT_LENGTH] + "\n\n[... content truncated ...]"
+                full_text = full_text[:self.MAX_TEXT_LENGTH] + _TRUNCATION_NOTICE
 
             return {
                 'name': name,
                 'type': 'pdf',
                 'content': full_text,
-                'pages': len(reader.pages)
+                'pages': num_pages
             }
         except Exception as e:
-            logger.error(f"Error processing PDF {name}: {e}", exc_info=True)
+            logger.exception("Error processing PDF %s: %s", name, e)
             return {
                 'name': name,
                 'type': 'pdf',
@@ -121,9 +229,10 @@ class FileProcessor:
     def _process_zip(self, name: str, content_b64: str) -> Dict:
         """List and extract text files from ZIP archive."""
         try:
-            # Validate and decode base64
+            # Validate and decode base64. The stripped copy is a temporary so
+            # it is freed before parsing rather than held alongside the bytes
             try:
-                zip_bytes = base64.b64decode(content_b64, validate=True)
+                zip_bytes = _b64decode(_strip_base64(content_b64), validate=True)
             except binascii.Error as e:
                 logger.warning(f"Invalid base64 encoding for ZIP {name}: {e}")
                 return {
@@ -133,56 +242,72 @@ class FileProcessor:
                     'content': '[Error: Invalid base64 encoding. Please re-upload the file.]'
                 }
 
-            zip_file = io.BytesIO(zip_bytes)
-
-            with zipfile.ZipFile(zip_file, 'r') as zf:
-                file_list = zf.namelist()
+            with zipfile.ZipFile(io.BytesIO(zip_bytes), 'r') as zf:
+                # The central directory is parsed once on open; reuse its
+                # entries for both the listing and member selection
+                infos = zf.infolist()
+                file_count = len(infos)
 
                 # Extract text from readable files
                 extracted_texts = []
                 total_size = 0
-
-                for file_name in file_list:
-                    # Skip directories and hidden files
-                    if file_name.endswith('/') or file_name.startswith('__'):
-                        continue
-
-                    # Check if it's a text file
-                    ext = file_name.split('.')[-1].lower() if '.' in file_name else ''
-                    text_extensions = ['txt', 'md', 'json', 'xml', 'csv', 'py', 'js', 'ts',
-                                       'html', 'css', 'java', 'c', 'cpp', 'h', 'go', 'rs',
-                                       'rb', 'php', 'sh', 'yaml', 'yml', 'toml', 'ini', 'cfg']
-
-                    if ext in text_extensions:
-                        try:
-                            with zf.open(file_name) as f:
-                                file_content = f.read().decode('utf-8', errors='ignore')
-                                if len(file_content) > 10000:
-                                    file_content = file_content[:10000] + "\n[... truncated ...]"
-                                extracted_texts.append(f"=== {file_name} ===\n{file_content}")
-                                total_size += len(file_content)
-
-                                # Stop if we've extracted too much
-                                if total_size > self.MAX_TEXT_LENGTH:
-                                    extracted_texts.append("\n[... additional files not extracted ...]")
-                                    break
-                        except Exception:
-                            pass  # Skip files that can't be read
-
-                content = f"ZIP Archive: {name}\nFiles: {len(file_list)}\n\n"
-                content += "Contents:\n" + "\n".join(f"  - {f}" for f in file_list[:50])
-                if len(file_list) > 50:
-                    content += f"\n  ... and {len(file_list) - 50} more files"
+                max_member_bytes = self.MAX_ZIP_MEMBER_CHARS * 4
+
+                # Non-empty text files, skipping directories and hidden files.
+                # Smallest first so many small files fill the text budget
+                # before one large file can exhaust it.
+                text_members = [
+                    info for info in infos
+                    if not info.is_dir()
+                    and not info.filename.startswith('__')
+                    and info.file_size > 0
+                    and os.path.splitext(info.filename)[1][1:].lower() in _TEXT_EXTENSIONS
+                ]
+                text_members.sort(key=lambda info: info.file_size)
+
+                for info in text_members:
+                    try:
+                        with zf.open(info) as f:
+                            # Valid UTF-8 is at most 4 bytes per char, so only
+                            # inflate as much of the member as could survive truncation
+                            raw = f.read(max_member_bytes + 1)
+                            truncated = len(raw) > max_member_bytes
+                            file_content = raw[:max_member_bytes].decode('utf-8', errors='ignore')
+                            if truncated and len(file_content) < self.MAX_ZIP_MEMBER_CHARS:
+                                # Invalid bytes were dropped, so the cut may fall
+                                # short of the limit; decode the whole member
+                                file_content = (raw + f.read()).decode('utf-8', errors='ignore')
+                                truncated = False
+                        if truncated or len(file_content) > self.MAX_ZIP_MEMBER_CHARS:
+                            file_content = file_content[:self.MAX_ZIP_MEMBER_CHARS] + "\n[... truncated ...]"
+                        extracted_texts.append(f"=== {info.filename} ===\n{file_content}")
+                        total_size += len(file_content)
+
+                        # Stop if we've extracted too much
+                        if total_size > self.MAX_TEXT_LENGTH:
+                            extracted_texts.append("\n[... additional files not extracted ...]")
+                            break
+                    except Exception:
+                        pass  # Skip files that can't be read
+
+                # Collect the summary pieces and join once
+                parts = [
+                    f"ZIP Archive: {name}\nFiles: {file_count}\n\nContents:\n",
+                    "\n".join(f"  - {info.filename}" for info in infos[:50]),
+                ]
+                if file_count > 50:
+                    parts.append(f"\n  ... and {file_count - 50} more files")
 
                 if extracted_texts:
-                    content += "\n\n--- Extracted Text Files ---\n\n"
-                    content += "\n\n".join(extracted_texts)
+                    parts.append("\n\n--- Extracted Text Files ---\n\n")
+                    parts.append("\n\n".join(extracted_texts))
+                content = "".join(parts)
 
                 return {
                     'name': name,
                     'type': 'zip',
                     'content': content,
-                    'files': len(file_list)
+                    'files': file_count
                 }
         except Exception as e:
             return {
@@ -194,9 +319,18 @@ class FileProcessor:
 
     def _process_text(self, name: str, content: str, file_type: str) -> Dict:
         """Process text/code file."""
+        truncated = False
+        if not content:
+            content = ''
+        elif isinstance(content, (bytes, bytearray)):
+            # Decode only what can survive truncation (UTF-8 is <= 4 bytes/char)
+            max_bytes = self.MAX_TEXT_LENGTH * 4
+            truncated = len(content) > max_bytes
+            content = bytes(content[:max_bytes]).decode('utf-8', errors='ignore')
+
         # Truncate if too long
-        if len(content) > self.MAX_TEXT_LENGTH:
-            content = content[:self.MAX_TEXT_LENGTH] + "\n\n[... content truncated ...]"
+        if truncated or len(content) > self.MAX_TEXT_LENGTH:
+            content = content[:self.MAX_TEXT_LENGTH] + _TRUNCATION_NOTICE
 
         return {
             'name': name,
@@ -214,15 +348,21 @@ class FileProcessor:
         Returns:
             Formatted string with all file contents
         """
-        logger.debug(f"format_files_for_context called with {len(files) if files else 0} files")
+        logger.debug("format_files_for_context called with %d files", len(files) if files else 0)
         if not files:
             return ""
 
+        # Each file is independent, so decode and extract them in parallel;
+        # map() keeps the results in the order the files were attached
+        if len(files) > 1:
+            with ThreadPoolExecutor(max_workers=min(MAX_FILE_WORKERS, len(files))) as executor:
+                processed_files = list(executor.map(self.process_file, files))
+        else:
+            processed_files = [self.process_file(files[0])]
+
         parts = ["The user has shared the following files:\n"]
 
-        for file_data in files:
-            logger.debug(f"Processing file_data: {file_data.get('name', 'unknown')}")
-            processed = self.process_file(file_data)
+        for processed in processed_files:
             name = processed.get('name', 'unknown')
             content = processed.get('content', '')
             file_type = processed.get('type', 'text')
@@ -7,18 +7,22 @@ image generation interfaces.
 """
 
 import asyncio
-import base64
+import binascii
+import functools
 import logging
 import os
 import re
 import secrets
+import stat
 import tempfile
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Any, List
+from typing import Optional, Any, AsyncIterator, Dict, List, Sequence, Tuple
 from urllib.parse import urlparse
 
-from playwright.async_api import async_playwright, Browser, Page, BrowserContext
+from cachetools import LRUCache
+from playwright.async_api import async_playwright, Browser, Page, BrowserContext, Locator
 
 logger = logging.getLogger(__name__)
 
@@ -37,90 +41,305 @@ ALLOWED_OUTPUT_DIRS = [
 # Maximum output file size (prevent disk exhaustion)
 MAX_OUTPUT_FILE_SIZE = 100 * 1024 * 1024  # 100 MB
 
+# Gallery images downloaded at once (Spaces may rate-limit)
+MAX_IMAGE_FETCH_CONCURRENCY = 4
 
-def _is_path_safe(output_path: str, allowed_dirs: List[Path] = None) -> tuple[bool, str]:
+
+def _dir_prefixes(dirs: List[Path], resolve: bool = False) -> tuple[str, ...]:
+    """Normalize directories to absolute string prefixes ending in a separator."""
+    normalize = os.path.realpath if resolve else os.path.abspath
+    return tuple(os.path.join(normalize(d), '') for d in dirs)
+
+
+def _is_within(path: str, prefixes: tuple[str, ...]) -> bool:
+    """Check whether an absolute, normalized path is equal to or inside any prefix dir."""
+    return (path + os.sep).startswith(prefixes)
+
+
+# Output directories known to exist, so repeated saves skip the exists() stat
+VERIFIED_DIR_CACHE_SIZE = 256
+_verified_output_dirs: LRUCache = LRUCache(maxsize=VERIFIED_DIR_CACHE_SIZE)
+
+# Characters rejected in output filenames
+_INVALID_FILENAME_CHARS = frozenset('<>:"|?*\x00')
+
+# ALLOWED_OUTPUT_DIRS normalized once at import, lexically and with symlinks resolved
+_ALLOWED_OUTPUT_PREFIXES = _dir_prefixes(ALLOWED_OUTPUT_DIRS)
+_ALLOWED_OUTPUT_REAL_PREFIXES = _dir_prefixes(ALLOWED_OUTPUT_DIRS, resolve=True)
+
+
+# Distinct absolute paths whose lexical check results are memoized
+PATH_CHECK_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=PATH_CHECK_CACHE_SIZE)
+def _check_absolute_path(abs_path: str, allowed_prefixes: tuple[str, ...]) -> tuple[bool, str]:
+    """Run the allowed-directory and filename checks on an absolute path.
+
+    Pure string checks, so results are memoized for repeated saves.
+    """
+    # Ensure path is equal to or a child of an allowed directory
+    if not _is_within(abs_path, allowed_prefixes):
+        return False, f"Path must be within allowed directories"
+
+    # Check filename for dangerous patterns
+    filename = os.path.basename(abs_path)
+    if filename.startswith('.'):
+        return False, "Hidden files not allowed"
+    if not _INVALID_FILENAME_CHARS.isdisjoint(filename):
+        return False, "Invalid characters in filename"
+
+    return True, ""
+
+
+def _is_path_safe(output_path: str, allowed_dirs: List[Path] = None) -> tuple[bool, str, Optional[str]]:
     """
     Validate that an output path is safe and within allowed directories.
 
+    The directory checks are lexical; the only filesystem access is an lstat()
+    that rejects a path which is itself a symlink. Callers that write to the
+    path must still confirm where parent symlinks lead, see save_image().
+
     Returns:
-        (is_safe, error_message)
+        (is_safe, error_message, absolute_path)
     """
     if allowed_dirs is None:
-        allowed_dirs = ALLOWED_OUTPUT_DIRS
+        allowed_prefixes = _ALLOWED_OUTPUT_PREFIXES
+    else:
+        allowed_prefixes = _dir_prefixes(allowed_dirs)
 
     try:
-        path = Path(output_path).resolve()
-    except (OSError, RuntimeError) as e:
-        return False, f"Cannot resolve path: {e}"
+        abs_path = os.path.abspath(output_path)
+    except (OSError, ValueError) as e:
+        return False, f"Cannot resolve path: {e}", None
 
     # Check for path traversal attempts
     if '..' in output_path:
-        return False, "Path traversal (..) not allowed"
+        return False, "Path traversal (..) not allowed", None
 
-    # Ensure path is within an allowed directory
-    is_within_allowed = False
-    for allowed_dir in allowed_dirs:
-        try:
-            allowed_resolved = allowed_dir.resolve()
-            # Check if path is equal to or a child of allowed_dir
-            try:
-                path.relative_to(allowed_resolved)
-                is_within_allowed = True
-                break
-            except ValueError:
-                continue
-        except (OSError, RuntimeError):
-            continue
-
-    if not is_within_allowed:
-        return False, f"Path must be within allowed directories"
+    is_safe, error = _check_absolute_path(abs_path, allowed_prefixes)
+    if not is_safe:
+        return False, error, None
 
-    # Check filename for dangerous patterns
-    filename = path.name
-    if filename.startswith('.'):
-        return False, "Hidden files not allowed"
-    if any(c in filename for c in ['<', '>', ':', '"', '|', '?', '*', '\x00']):
-        return False, "Invalid characters in filename"
+    # SECURITY: Reject symlinks on the unresolved path, before anything follows them
+    try:
+        if stat.S_ISLNK(os.lstat(abs_path).st_mode):
+            return False, "Symlinks not allowed", None
+    except FileNotFoundError:
+        pass  # Target doesn't exist yet
+    except OSError as e:
+        return False, f"Cannot resolve path: {e}", None
 
-    return True, ""
+    return True, "", abs_path
 
 
-def _generate_secure_screenshot_path() -> str:
+# Secure temporary directory for debug screenshots, looked up once
+_TEMP_DIR = tempfile.gettempdir()
+
+
+def _generate_secure_screenshot_path(prefix: str = "debug") -> str:
     """Generate a secure, unpredictable path for debug screenshots."""
-    # Use secure random token for unpredictable filename
-    token = secrets.token_hex(16)
-    # Use tempfile to get a secure temporary directory
-    temp_dir = tempfile.gettempdir()
-    return os.path.join(temp_dir, f"peanutchat_debug_{token}.png")
+    # Use secure random token for unpredictable filename (128 bits, URL-safe alphabet)
+    token = secrets.token_urlsafe(16)
+    return os.path.join(_TEMP_DIR, f"peanutchat_{prefix}_{token}.png")
 
 
-class GradioAutomation:
-    """Base class for automating Gradio-based Hugging Face Spaces."""
-    
-    def __init__(
-        self,
-        space_url: str,
-        browser_path: Optional[str] = None,
-        headless: bool = True,
-        timeout: int = 300000  # 5 minutes default for image gen (increased for multiple model calls)
-    ):
-        self.space_url = space_url
-        self.browser_path = browser_path
-        self.headless = headless
-        self.timeout = timeout
-        self._playwright = None
-        self._browser: Optional[Browser] = None
-        
-    async def __aenter__(self):
-        await self.start()
-        return self
-        
-    async def __aexit__(self, *args):
-        await self.close()
-        
-    async def start(self):
-        """Start the browser."""
-        self._playwright = await async_playwright().start()
+# =============================================================================
+# SELECTORS
+# =============================================================================
+
+_TEXTBOX_SELECTOR = "textarea, input[type='text']"
+_IMAGE_FILE_INPUT_SELECTOR = "input[type='file'][accept*='image']"
+_FILE_INPUT_SELECTOR = "input[type='file']"
+_NUMBER_INPUT_SELECTOR = "input[type='number']"
+_RANGE_INPUT_SELECTOR = "input[type='range']"
+_DROPDOWN_SELECTOR = "select, [role='listbox']"
+_LABELED_DROPDOWN_SELECTOR = "select, [role='listbox'], .dropdown"
+_PRIMARY_BUTTON_SELECTOR = "button.primary, button.lg, button[type='submit']"
+_DOWNLOAD_BUTTON_SELECTOR = (
+    "button:has-text('Download'), a:has-text('Download'), [download], "
+    "button[title*='download'], a[title*='download']"
+)
+
+# Indicators that a generation has started
+_GENERATING_SELECTOR = (
+    ".generating, .loading, .progress, [class*='loading'], [class*='progress'], .eta-bar"
+)
+
+# Output image selectors, most specific first, for spaces whose output images
+# the size scan misses
+_OUTPUT_IMAGE_SELECTORS = (
+    ".output-image img",
+    ".gradio-image img",
+    ".image-container img",
+    "[data-testid='image'] img",
+    ".gallery img",
+    "#output img",
+    ".output img",
+    "img[src*='blob:']",
+    "img[src*='data:']",
+    "img[src*='file=']",
+)
+
+
+# =============================================================================
+# IN-PAGE SCRIPTS
+# =============================================================================
+
+# Generated images among the page's <img> elements: skips SVG icons and
+# anything smaller than minSize in either dimension
+_OUTPUT_IMAGES_JS = """
+    Array.from(document.querySelectorAll('img')).filter(img => {
+        const src = img.src || '';
+        if (src.startsWith('data:image/svg') || src.includes('.svg')) return false;
+        return img.naturalWidth >= minSize && img.naturalHeight >= minSize;
+    })
+"""
+
+# True once a generated image has finished loading
+_HAS_OUTPUT_IMAGE_JS = (
+    "(minSize) => " + _OUTPUT_IMAGES_JS.strip() + ".some(img => img.complete)"
+)
+
+# Resolves true as soon as a generated image has loaded, or false after
+# timeoutMs. Re-checks only when the DOM changes or an image finishes loading,
+# so nothing runs in the page while a generation is in progress but idle.
+_WAIT_FOR_OUTPUT_IMAGE_JS = """([minSize, timeoutMs]) => new Promise(resolve => {
+    const hasOutput = """ + _HAS_OUTPUT_IMAGE_JS + """;
+    if (hasOutput(minSize)) {
+        resolve(true);
+        return;
+    }
+    let timer = null;
+    const onChange = () => {
+        if (hasOutput(minSize)) finish(true);
+    };
+    const observer = new MutationObserver(onChange);
+    const finish = (result) => {
+        observer.disconnect();
+        document.removeEventListener('load', onChange, true);
+        clearTimeout(timer);
+        resolve(result);
+    };
+    observer.observe(document.body, {
+        subtree: true, childList: true, attributes: true, attributeFilter: ['src']
+    });
+    // <img> load events don't bubble but can be captured at the document
+    document.addEventListener('load', onChange, true);
+    timer = setTimeout(() => finish(false), timeoutMs);
+})"""
+
+# Source and size of every generated image, in document order
+_LIST_OUTPUT_IMAGES_JS = (
+    "(minSize) => " + _OUTPUT_IMAGES_JS.strip()
+    + ".map(img => ({src: img.src || '', width: img.naturalWidth, height: img.naturalHeight}))"
+)
+
+# Sources of visible gallery/grid images, in document order
+_GALLERY_IMAGE_SOURCES_JS = """() => Array.from(
+    document.querySelectorAll(".gallery img, .grid img, [role='group'] img")
+).filter(img => img.src && (img.offsetWidth || img.offsetHeight || img.getClientRects().length))
+ .map(img => img.src)"""
+
+# Reads a blob: URL's original bytes as base64. The blob is fetched as-is
+# rather than redrawn on a canvas, so the image is not re-encoded as PNG; the
+# canvas is only used if the blob URL has already been revoked.
+_BLOB_TO_BASE64_JS = """async (src) => {
+    try {
+        const blob = await (await fetch(src)).blob();
+        return await new Promise((resolve, reject) => {
+            const reader = new FileReader();
+            reader.onload = () => resolve(reader.result.split(',')[1]);
+            reader.onerror = () => reject(reader.error);
+            reader.readAsDataURL(blob);
+        });
+    } catch (e) {
+        const img = Array.from(document.images).find(el => el.src === src);
+        if (!img) return null;
+        const canvas = document.createElement('canvas');
+        canvas.width = img.naturalWidth;
+        canvas.height = img.naturalHeight;
+        canvas.getContext('2d').drawImage(img, 0, 0);
+        return canvas.toDataURL('image/png').split(',')[1];
+    }
+}"""
+
+
+# Lowercase button texts that dismiss cookie banners and popups, in priority order
+_POPUP_BUTTON_TEXTS = ('accept', 'ok', 'close', 'got it', 'i agree')
+
+# Clicks the first visible popup-dismiss control, trying patterns in priority
+# order and stopping at the first click, since pages rarely show more than one
+# popup. Button text matching is case-insensitive substring, like :has-text().
+# Takes _POPUP_BUTTON_TEXTS; returns the number of elements clicked (0 or 1).
+_DISMISS_POPUPS_JS = """(texts) => {
+    const isVisible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const buttons = Array.from(document.querySelectorAll('button'));
+    const candidates = [
+        ...texts.map(
+            text => () => buttons.find(btn => (btn.textContent || '').toLowerCase().includes(text))
+        ),
+        () => document.querySelector("[aria-label='Close']"),
+        () => document.querySelector('.modal button.close'),
+    ];
+
+    for (const find of candidates) {
+        const el = find();
+        if (el && el.isConnected && isVisible(el)) {
+            el.click();
+            return 1;
+        }
+    }
+    return 0;
+}"""
+
+
+# The src attribute of the index-th match of the first selector whose match is
+# visible and has a src, or null. Takes [selectors, index].
+_FIND_SELECTOR_IMAGE_JS = """([selectors, index]) => {
+    for (const selector of selectors) {
+        const img = document.querySelectorAll(selector)[index];
+        if (!img || !(img.offsetWidth || img.offsetHeight || img.getClientRects().length)) continue;
+        const src = img.getAttribute('src');
+        if (src) return src;
+    }
+    return null;
+}"""
+
+
+# =============================================================================
+# SHARED BROWSER
+# =============================================================================
+
+# One Playwright driver and one Chromium per launch configuration, kept for the
+# life of the process. Launching Chromium takes seconds, so operations share it
+# and each gets its own isolated BrowserContext instead.
+_shared_playwright = None
+_shared_browsers: Dict[Tuple[bool, Optional[str]], Browser] = {}
+_browser_lock = asyncio.Lock()
+
+# Pages open at once across all shared browsers; more would thrash Chromium
+MAX_CONCURRENT_PAGES = min(8, os.cpu_count() or 4)
+_page_semaphore = asyncio.Semaphore(MAX_CONCURRENT_PAGES)
+
+
+async def _get_shared_browser(headless: bool, browser_path: Optional[str] = None) -> Browser:
+    """Get the shared browser for a launch configuration, launching it if needed."""
+    global _shared_playwright
+
+    key = (headless, browser_path)
+    browser = _shared_browsers.get(key)
+    if browser is not None and browser.is_connected():
+        return browser
+
+    async with _browser_lock:
+        # Double-check after acquiring lock
+        browser = _shared_browsers.get(key)
+        if browser is not None and browser.is_connected():
+            return browser
+
+        if _shared_playwright is None:
+            _shared_playwright = await async_playwright().start()
 
         # Browser launch arguments
         # NOTE ON SECURITY FLAGS:
@@ -134,43 +353,130 @@ class GradioAutomation:
         # 3. Each operation uses a fresh browser context that's destroyed after use
         # FUTURE: Consider using a proxy server to handle CORS instead
         launch_args = {
-            "headless": self.headless,
+            "headless": headless,
             "args": [
                 "--no-sandbox",
                 "--disable-setuid-sandbox",
                 "--disable-dev-shm-usage",
                 "--disable-gpu",
                 "--disable-web-security",  # Required for HF Spaces - see security note above
+                # Background services automation never uses; skipping them
+                # speeds up launch and lowers memory
+                "--disable-extensions",
+                "--disable-background-networking",
+                "--disable-default-apps",
+                "--disable-sync",
+                "--metrics-recording-only",
+                "--mute-audio",
+                "--disable-features=Translate,BackForwardCache,AcceptCHFrame",
             ]
         }
-        
+
         # Find browser - only specify if explicitly provided
         # Playwright can auto-discover its installed browser
-        if self.browser_path:
-            launch_args["executable_path"] = self.browser_path
+        if browser_path:
+            launch_args["executable_path"] = browser_path
+
+        logger.info("Launching shared Chromium browser")
+        browser = await _shared_playwright.chromium.launch(**launch_args)
+        _shared_browsers[key] = browser
+        return browser
+
+
+async def cleanup_shared_browsers():
+    """Close the shared browsers and stop Playwright on shutdown."""
+    global _shared_playwright
+
+    async with _browser_lock:
+        for browser in _shared_browsers.values():
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing shared browser: {type(e).__name__}")
+        _shared_browsers.clear()
+
+        if _shared_playwright is not None:
+            await _shared_playwright.stop()
+            _shared_playwright = None
+
+
+class GradioAutomation:
+    """Base class for automating Gradio-based Hugging Face Spaces."""
+
+    # Cap for error-path debug screenshots, so a hung page can't delay the error
+    DEBUG_SCREENSHOT_TIMEOUT_MS = 5000
+
+    # Wait for click_any_button()'s buttons; the form is already loaded by then
+    BUTTON_WAIT_TIMEOUT_MS = 10000
+    
+    def __init__(
+        self,
+        space_url: str,
+        browser_path: Optional[str] = None,
+        headless: bool = True,
+        timeout: int = 300000  # 5 minutes default for image gen (increased for multiple model calls)
+    ):
+        self.space_url = space_url
+        self.browser_path = browser_path
+        self.headless = headless
+        self.timeout = timeout
+        self._browser: Optional[Browser] = None
         
-        self._browser = await self._playwright.chromium.launch(**launch_args)
+    async def __aenter__(self):
+        await self.start()
+        return self
         
+    async def __aexit__(self, *args):
+        await self.close()
+        
+    async def start(self):
+        """Attach to the shared browser, launching it on first use."""
+        self._browser = await _get_shared_browser(self.headless, self.browser_path)
+
     async def close(self):
-        """Close the browser."""
-        if self._browser:
-            await self._browser.close()
-        if self._playwright:
-            await self._playwright.stop()
-    
+        """Release this instance's browser.
+
+        The browser itself is shared and stays running for later operations;
+        it is shut down by cleanup_shared_browsers() on application shutdown.
+        """
+        self._browser = None
+
     async def new_context(self) -> BrowserContext:
         """Create a new browser context."""
-        if not self._browser:
+        if not self._browser or not self._browser.is_connected():
             await self.start()
         return await self._browser.new_context(
             accept_downloads=True,
             viewport={"width": 1920, "height": 1080}
         )
     
+    @asynccontextmanager
+    async def new_page(self) -> AsyncIterator[Page]:
+        """Open a page in a fresh browser context, closing the context on exit.
+
+        Waits for a free slot when MAX_CONCURRENT_PAGES pages are already open.
+        """
+        async with _page_semaphore:
+            context = await self.new_context()
+            try:
+                page = await context.new_page()
+                page.set_default_timeout(self.timeout)
+                yield page
+            finally:
+                await context.close()
+
     async def wait_for_gradio_load(self, page: Page, timeout: int = 120000):
         """Wait for Gradio interface to fully load."""
         await page.wait_for_selector(".gradio-container", timeout=timeout)
-        await page.wait_for_timeout(3000)  # Increased wait for slow-loading spaces
+        # Slow spaces mount the container before their components; wait until
+        # the app has rendered its controls rather than sleeping a fixed time
+        try:
+            await page.wait_for_function(
+                "() => !!(window.gradio_config || document.querySelector('.gradio-container button'))",
+                timeout=10000
+            )
+        except Exception:
+            pass
         try:
             await page.wait_for_selector(".loading", state="hidden", timeout=10000)
         except Exception:
@@ -178,23 +484,12 @@ class GradioAutomation:
     
     async def dismiss_popups(self, page: Page):
         """Dismiss any cookie banners or popups."""
-        popup_selectors = [
-            "button:has-text('Accept')",
-            "button:has-text('OK')",
-            "button:has-text('Close')",
-            "button:has-text('Got it')",
-            "button:has-text('I agree')",
-            "[aria-label='Close']",
-            ".modal button.close",
-        ]
-        for selector in popup_selectors:
-            try:
-                btn = page.locator(selector).first
-                if await btn.is_visible(timeout=3000):
-                    await btn.click()
-                    await page.wait_for_timeout(1000)
-            except Exception:
-                pass
+        try:
+            clicked = await page.evaluate(_DISMISS_POPUPS_JS, list(_POPUP_BUTTON_TEXTS))
+        except Exception:
+            return
+        if clicked:
+            await page.wait_for_timeout(300)  # Let the popup close
             
     async def fill_textbox(self, page: Page, text: str, label: Optional[str] = None,
                           placeholder: Optional[str] = None, index: int = 0):
@@ -209,10 +504,10 @@ class GradioAutomation:
             index: Index if multiple textboxes (0-based)
         """
         # Simple direct approach - find all text inputs and use index
-        textbox = page.locator("textarea, input[type='text']").nth(index)
+        textbox = page.locator(_TEXTBOX_SELECTOR).nth(index)
         await textbox.fill(text, timeout=20000)
         
-    async def upload_image(self, page: Page, file_path: str, label: Optional[str] = None, index: int = 0):
+    async def upload_image(self, page: Page, file_path: str, label: Optional[str] = None, index: int = 0) -> bool:
         """
         Upload an image to a Gradio image upload component.
         
@@ -221,6 +516,9 @@ class GradioAutomation:
             file_path: Path to image file to upload
             label: Optional label to find the right upload
             index: Index if multiple uploads
+
+        Returns:
+            True if the upload's preview was seen, see wait_for_upload_complete()
         """
         file_path = str(Path(file_path).absolute())
         
@@ -230,15 +528,41 @@ class GradioAutomation:
         # Find file input
         if label:
             container = page.locator(f"*:has(> label:has-text('{label}')), *:has(> span:has-text('{label}'))").first
-            file_input = container.locator("input[type='file']").first
+            file_input = container.locator(_FILE_INPUT_SELECTOR).first
         else:
-            file_input = page.locator("input[type='file'][accept*='image']").nth(index)
+            file_input = page.locator(_IMAGE_FILE_INPUT_SELECTOR).nth(index)
             # Fallback to any file input
             if not await file_input.count():
-                file_input = page.locator("input[type='file']").nth(index)
+                file_input = page.locator(_FILE_INPUT_SELECTOR).nth(index)
         
+        image_count = await page.evaluate("() => document.images.length")
         await file_input.set_input_files(file_path)
-        await page.wait_for_timeout(4000)  # Wait for upload processing (increased for larger files)
+        return await self.wait_for_upload_complete(page, image_count)
+
+    async def wait_for_upload_complete(self, page: Page, image_count: int, timeout: int = 4000) -> bool:
+        """
+        Wait for an upload to finish processing.
+
+        Done once a new image (the upload preview) has rendered and nothing is
+        still marked as uploading.
+
+        Args:
+            page: Playwright page
+            image_count: Number of images on the page before the upload started
+            timeout: Timeout in milliseconds (sized for larger files)
+
+        Returns:
+            True if the upload completed, False if the timeout elapsed first
+        """
+        try:
+            await page.wait_for_function(
+                "(count) => document.images.length > count && !document.querySelector('.uploading')",
+                arg=image_count,
+                timeout=timeout
+            )
+            return True
+        except Exception:
+            return False
         
     async def set_slider(self, page: Page, value: float, label: Optional[str] = None, index: int = 0, timeout: int = 5000):
         """
@@ -253,7 +577,7 @@ class GradioAutomation:
         """
         # Try setting via number input first (most reliable)
         try:
-            number_inputs = page.locator("input[type='number']")
+            number_inputs = page.locator(_NUMBER_INPUT_SELECTOR)
             if await number_inputs.count() > index:
                 number_input = number_inputs.nth(index)
                 if await number_input.is_visible(timeout=timeout):
@@ -264,11 +588,24 @@ class GradioAutomation:
 
         # Try range slider
         try:
-            slider_input = page.locator("input[type='range']").nth(index)
+            slider_input = page.locator(_RANGE_INPUT_SELECTOR).nth(index)
             await slider_input.fill(str(value), timeout=timeout)
         except Exception:
             pass  # Slider might not exist, that's OK
         
+    @staticmethod
+    async def _role_or_fallback(by_role: Locator, fallback: Locator) -> Locator:
+        """
+        Pick the first element matched by role, or by the CSS fallback if none is.
+
+        Waits for either locator to match before choosing, so the choice isn't
+        made before the element has rendered.
+        """
+        await by_role.or_(fallback).first.wait_for(state="attached")
+        if await by_role.count():
+            return by_role.first
+        return fallback.first
+
     async def select_dropdown(self, page: Page, value: str, label: Optional[str] = None, index: int = 0):
         """
         Select a value from a Gradio dropdown.
@@ -281,9 +618,9 @@ class GradioAutomation:
         """
         if label:
             container = page.locator(f"*:has(> label:has-text('{label}'))").first
-            dropdown = container.locator("select, [role='listbox'], .dropdown").first
+            dropdown = container.locator(_LABELED_DROPDOWN_SELECTOR).first
         else:
-            dropdown = page.locator("select, [role='listbox']").nth(index)
+            dropdown = page.locator(_DROPDOWN_SELECTOR).nth(index)
         
         # Try native select
         try:
@@ -295,8 +632,10 @@ class GradioAutomation:
         # Try Gradio custom dropdown
         try:
             await dropdown.click()
-            await page.wait_for_timeout(300)
-            option = page.locator(f"[role='option']:has-text('{value}'), .dropdown-item:has-text('{value}')").first
+            option = await self._role_or_fallback(
+                page.get_by_role("option", name=value),
+                page.locator(".dropdown-item", has_text=value)
+            )
             await option.click()
         except Exception:
             pass
@@ -311,12 +650,55 @@ class GradioAutomation:
             index: Button index if no text specified
         """
         if text:
-            button = page.locator(f"button:has-text('{text}')").first
+            button = await self._role_or_fallback(
+                page.get_by_role("button", name=text),
+                page.locator("button", has_text=text)
+            )
         else:
-            button = page.locator("button.primary, button.lg, button[type='submit']").nth(index)
+            button = page.locator(_PRIMARY_BUTTON_SELECTOR).nth(index)
         
         await button.click()
         
+    async def click_any_button(self, page: Page, texts: Sequence[str]) -> str:
+        """
+        Click the button labelled with the highest-priority text present.
+
+        Texts are tried in order, whatever the page order. A button whose whole
+        label is a text (ignoring case and surrounding whitespace, punctuation
+        or emoji) is preferred. Otherwise, like :has-text(), any label that
+        contains a text matches. The text must be a whole word, so busy labels
+        like "Running..." or "Generating..." are skipped. One short wait covers
+        all the texts.
+
+        Args:
+            page: Playwright page
+            texts: Button texts to match, highest priority first
+
+        Returns:
+            The text whose button was clicked
+
+        Raises:
+            Exception: If no button matches any of the texts
+        """
+        escaped = [re.escape(text) for text in texts]
+        any_text = re.compile(rf"\b(?:{'|'.join(escaped)})\b", re.IGNORECASE)
+        await page.get_by_role("button", name=any_text).or_(
+            page.locator("button", has_text=any_text)
+        ).first.wait_for(state="attached", timeout=self.BUTTON_WAIT_TIMEOUT_MS)
+
+        for label_pattern in (r"^\W*{}\W*$", r"\b{}\b"):
+            for text, pattern in zip(texts, escaped):
+                label = re.compile(label_pattern.format(pattern), re.IGNORECASE)
+                for button in (
+                    page.get_by_role("button", name=label),
+                    page.locator("button", has_text=label),
+                ):
+                    if await button.count():
+                        await button.first.click()
+                        return text
+
+        raise Exception(f"No button labelled any of: {', '.join(texts)}")
+        
     async def wait_for_generation(self, page: Page, timeout: Optional[int] = None, min_image_size: int = 256):
         """
         Wait for image generation to complete.
@@ -326,58 +708,20 @@ class GradioAutomation:
 
         # Wait for processing to start
         try:
-            await page.wait_for_selector(
-                ".generating, .loading, .progress, [class*='loading'], [class*='progress'], .eta-bar",
-                timeout=20000
-            )
+            await page.wait_for_selector(_GENERATING_SELECTOR, timeout=20000)
         except Exception:
             pass
 
-        # Wait for processing to complete OR output image to appear
-        start_time = asyncio.get_event_loop().time()
-        while (asyncio.get_event_loop().time() - start_time) * 1000 < timeout:
-            # Check if we have a generated image already
-            has_output = await page.evaluate('''(minSize) => {
-                const imgs = document.querySelectorAll('img');
-                for (const img of imgs) {
-                    const src = img.src || '';
-                    if (src.startsWith('data:image/svg') || src.includes('.svg')) continue;
-                    if (img.naturalWidth >= minSize && img.naturalHeight >= minSize) {
-                        return true;
-                    }
-                }
-                return false;
-            }''', min_image_size)
+        # Wait for an output image to appear. A MutationObserver installed in
+        # the page resolves the moment one loads, in a single protocol call
+        has_output = await page.evaluate(_WAIT_FOR_OUTPUT_IMAGE_JS, [min_image_size, timeout])
+        if not has_output:
+            raise TimeoutError(f"Generation did not complete within {timeout}ms")
 
-            if has_output:
-                await page.wait_for_timeout(2000)  # Wait for image to fully load
-                return
+    async def _list_output_images(self, page: Page, min_size: int = 256) -> List[Dict[str, Any]]:
+        """List the page's loaded output images (src and natural size) in one scan."""
+        return await page.evaluate(_LIST_OUTPUT_IMAGES_JS, min_size) or []
 
-            # Check if still loading
-            loading = await page.query_selector(
-                ".generating, .loading:not(.hidden), .progress:not([style*='display: none']), .eta-bar"
-            )
-            if not loading:
-                await page.wait_for_timeout(3000)
-                # Double-check for output image
-                has_output = await page.evaluate('''(minSize) => {
-                    const imgs = document.querySelectorAll('img');
-                    for (const img of imgs) {
-                        const src = img.src || '';
-                        if (src.startsWith('data:image/svg') || src.includes('.svg')) continue;
-                        if (img.naturalWidth >= minSize && img.naturalHeight >= minSize) {
-                            return true;
-                        }
-                    }
-                    return false;
-                }''', min_image_size)
-                if has_output:
-                    return
-                # No loading indicator and no image yet - keep waiting
-            await page.wait_for_timeout(3000)
-        else:
-            raise TimeoutError(f"Generation did not complete within {timeout}ms")
-            
     async def get_output_image(self, page: Page, index: int = 0, min_size: int = 256) -> Optional[bytes]:
         """
         Get the generated image data from the output component.
@@ -390,82 +734,28 @@ class GradioAutomation:
         Returns:
             Image bytes or None if not found
         """
-        import urllib.request
-
         # Find large images and get their sources
-        image_info = await page.evaluate('''(minSize) => {
-            const imgs = document.querySelectorAll('img');
-            const found = [];
-            for (const img of imgs) {
-                const src = img.src || '';
-                // Skip SVG images
-                if (src.startsWith('data:image/svg') || src.includes('.svg')) continue;
-                // Skip small images (icons)
-                if (img.naturalWidth < minSize || img.naturalHeight < minSize) continue;
-                found.push({
-                    src: src,
-                    width: img.naturalWidth,
-                    height: img.naturalHeight
-                });
-            }
-            return found;
-        }''', min_size)
-
-        if not image_info:
-            return None
-
-        # Get the image at the specified index
-        if index >= len(image_info):
-            index = len(image_info) - 1
-        target = image_info[index]
-        src = target.get('src', '')
-
-        if not src:
+        image_info = await self._list_output_images(page, min_size)
+
+        if image_info:
+            # Get the image at the specified index
+            if index >= len(image_info):
+                index = len(image_info) - 1
+            src = image_info[index].get('src', '')
+            if src:
+                data = await self._fetch_image_data(page, src)
+                if data:
+                    return data
+
+        # Fallback: Try specific selectors, all in one in-page pass
+        try:
+            src = await page.evaluate(
+                _FIND_SELECTOR_IMAGE_JS, [list(_OUTPUT_IMAGE_SELECTORS), index]
+            )
+        except Exception:
             return None
-
-        # Handle different image source types
-        if src.startswith('data:image/'):
-            # Base64 data URL
-            try:
-                b64_data = src.split(',')[1]
-                return base64.b64decode(b64_data)
-            except Exception:
-                return None
-        elif src.startswith('http'):
-            # URL - fetch it directly (common for Gradio/HuggingFace)
-            try:
-                with urllib.request.urlopen(src, timeout=30) as resp:
-                    return resp.read()
-            except Exception as e:
-                logger.warning(f"Failed to fetch image from URL: {type(e).__name__}")
-                return None
-
-        # Fallback: Try specific selectors
-        selectors = [
-            ".output-image img",
-            ".gradio-image img",
-            ".image-container img",
-            "[data-testid='image'] img",
-            ".gallery img",
-            "#output img",
-            ".output img",
-            "img[src*='blob:']",
-            "img[src*='data:']",
-            "img[src*='file=']",
-        ]
-
-        for selector in selectors:
-            try:
-                images = page.locator(selector)
-                count = await images.count()
-                if count > index:
-                    img = images.nth(index)
-                    if await img.is_visible(timeout=5000):
-                        src = await img.get_attribute("src")
-                        if src:
-                            return await self._fetch_image_data(page, src)
-            except Exception:
-                continue
+        if src:
+            return await self._fetch_image_data(page, src)
 
         return None
     
@@ -473,31 +763,26 @@ class GradioAutomation:
         """Fetch image data from various source types."""
         try:
             if src.startswith("data:"):
-                # Data URL
-                b64_data = src.split(",", 1)[1]
-                return base64.b64decode(b64_data)
+                # Data URL - decode straight from after the comma, without
+                # splitting a copy of the prefix off first
+                return binascii.a2b_base64(src[src.index(",") + 1:])
                 
             elif src.startswith("blob:"):
-                # Blob URL - convert via canvas
-                b64_data = await page.evaluate('''async (src) => {
-                    const img = document.querySelector(`img[src="${src}"]`);
-                    if (!img) return null;
-                    const canvas = document.createElement('canvas');
-                    canvas.width = img.naturalWidth;
-                    canvas.height = img.naturalHeight;
-                    const ctx = canvas.getContext('2d');
-                    ctx.drawImage(img, 0, 0);
-                    return canvas.toDataURL('image/png').split(',')[1];
-                }''', src)
+                # Blob URL - read the original bytes in the page
+                b64_data = await page.evaluate(_BLOB_TO_BASE64_JS, src)
                 if b64_data:
-                    return base64.b64decode(b64_data)
+                    return binascii.a2b_base64(b64_data)
                     
             else:
-                # Regular URL
+                # Regular URL - fetch through the browser (common for
+                # Gradio/HuggingFace), reusing its connection and cookies
                 if src.startswith("/"):
                     parsed = urlparse(page.url)
                     src = f"{parsed.scheme}://{parsed.netloc}{src}"
-                response = await page.request.get(src)
+                response = await page.request.get(src, timeout=30000)
+                if not response.ok:
+                    logger.warning(f"Failed to fetch image from URL: HTTP {response.status}")
+                    return None
                 return await response.body()
                 
         except Exception as e:
@@ -508,22 +793,22 @@ class GradioAutomation:
         """Get all output images from a gallery or multiple outputs."""
         images = []
         
-        # Try gallery first
-        gallery_imgs = page.locator(".gallery img, .grid img, [role='group'] img")
-        count = await gallery_imgs.count()
-        
-        if count > 0:
-            for i in range(count):
-                try:
-                    img = gallery_imgs.nth(i)
-                    if await img.is_visible(timeout=3000):
-                        src = await img.get_attribute("src")
-                        if src:
-                            data = await self._fetch_image_data(page, src)
-                            if data:
-                                images.append(data)
-                except Exception:
-                    continue
+        # Try gallery first, collecting every visible source in one call
+        try:
+            sources = await page.evaluate(_GALLERY_IMAGE_SOURCES_JS)
+        except Exception:
+            sources = []
+
+        if sources:
+            semaphore = asyncio.Semaphore(MAX_IMAGE_FETCH_CONCURRENCY)
+
+            async def fetch(src: str) -> Optional[bytes]:
+                async with semaphore:
+                    return await self._fetch_image_data(page, src)
+
+            # Download concurrently; gather keeps the gallery order
+            results = await asyncio.gather(*(fetch(src) for src in sources))
+            images = [data for data in results if data]
         
         # Fallback to single image
         if not images:
@@ -536,7 +821,7 @@ class GradioAutomation:
     async def save_image(self, image_data: bytes, output_path: str) -> dict:
         """Save image data to file with security validation."""
         # SECURITY: Validate output path
-        is_safe, error = _is_path_safe(output_path)
+        is_safe, error, safe_path = _is_path_safe(output_path)
         if not is_safe:
             logger.warning(f"Blocked unsafe save_image path: {error}")
             return {
@@ -552,14 +837,15 @@ class GradioAutomation:
             }
 
         try:
-            path = Path(output_path).resolve()
+            path = Path(safe_path)
+            parent = os.path.dirname(safe_path)
 
             # Only create parent directory if it's within allowed paths
             # Don't use parents=True to prevent creating arbitrary directory trees
-            if not path.parent.exists():
-                # Check if parent is in allowed dirs
-                parent_safe, _ = _is_path_safe(str(path.parent))
-                if parent_safe:
+            if parent not in _verified_output_dirs and not os.path.exists(parent):
+                # safe_path is already absolute and normalized, so the parent
+                # only needs the memoized string checks, not a full _is_path_safe()
+                if _check_absolute_path(parent, _ALLOWED_OUTPUT_PREFIXES)[0]:
                     path.parent.mkdir(parents=False, exist_ok=True)
                 else:
                     return {
@@ -567,7 +853,37 @@ class GradioAutomation:
                         "error": "Cannot create directory outside allowed paths"
                     }
 
-            path.write_bytes(image_data)
+            # SECURITY: The checks above are lexical; resolve symlinks once,
+            # right before writing, so a link can't redirect the write outside
+            real_path = os.path.realpath(path)
+            if not _is_within(real_path, _ALLOWED_OUTPUT_REAL_PREFIXES):
+                logger.warning("Blocked save_image path that resolves outside allowed directories")
+                return {
+                    "success": False,
+                    "error": "Invalid output path: Path must be within allowed directories"
+                }
+
+            try:
+                # Write off the event loop so large images don't stall other pages
+                await asyncio.to_thread(path.write_bytes, image_data)
+            except FileNotFoundError:
+                # Directory was removed since it was verified: check again where
+                # it would resolve to, recreate it and retry the write once
+                _verified_output_dirs.pop(parent, None)
+                if not (
+                    _check_absolute_path(parent, _ALLOWED_OUTPUT_PREFIXES)[0]
+                    and _is_within(os.path.realpath(parent), _ALLOWED_OUTPUT_REAL_PREFIXES)
+                ):
+                    raise
+                path.parent.mkdir(parents=True, exist_ok=True)
+                if not _is_within(os.path.realpath(path), _ALLOWED_OUTPUT_REAL_PREFIXES):
+                    logger.warning("Blocked save_image path that resolves outside allowed directories")
+                    return {
+                        "success": False,
+                        "error": "Invalid output path: Path must be within allowed directories"
+                    }
+                await asyncio.to_thread(path.write_bytes, image_data)
+            _verified_output_dirs[parent] = True
             logger.info(f"Saved image to: {path}")
             return {
                 "success": True,
@@ -586,17 +902,14 @@ class GradioAutomation:
         """Try to download via the download button."""
         try:
             async with page.expect_download(timeout=10000) as download_info:
-                download_btn = page.locator(
-                    "button:has-text('Download'), a:has-text('Download'), [download], "
-                    "button[title*='download'], a[title*='download']"
-                ).first
+                download_btn = page.locator(_DOWNLOAD_BUTTON_SELECTOR).first
                 await download_btn.click()
             download = await download_info.value
             await download.save_as(output_path)
             return {
                 "success": True,
-                "path": str(Path(output_path).absolute()),
-                "size_bytes": Path(output_path).stat().st_size
+                "path": os.path.abspath(output_path),
+                "size_bytes": os.stat(output_path).st_size
             }
         except Exception as e:
             return {
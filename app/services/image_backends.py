@@ -11,32 +11,48 @@ import base64
 import logging
 import os
 import re
-import secrets
-import tempfile
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List
+from typing import Awaitable, Callable, Optional, List, Tuple
 from abc import ABC, abstractmethod
 
-from app.services.gradio_automation import GradioAutomation
+from playwright.async_api import Page
+
+from app.services.gradio_automation import (
+    GradioAutomation,
+    _generate_secure_screenshot_path,
+    cleanup_shared_browsers,
+)
 
 logger = logging.getLogger(__name__)
 
+# Prefer pybase64 (SIMD-accelerated) for encoding large outputs, fall back to stdlib
+try:
+    import pybase64
+    _b64encode = pybase64.b64encode
+except ImportError:
+    _b64encode = base64.b64encode
+
+# Patterns stripped from error messages before they reach the user
+_PATH_PATTERN = re.compile(r'/\S+')
+_URL_PATTERN = re.compile(r'https?://\S+')
+
+
+def _encode_base64(data: bytes) -> str:
+    """Base64-encode image bytes for a JSON response.
 
-def _generate_secure_debug_screenshot_path(prefix: str = "img_error") -> str:
-    """Generate a secure, unpredictable path for debug screenshots."""
-    token = secrets.token_hex(8)
-    temp_dir = tempfile.gettempdir()
-    return os.path.join(temp_dir, f"peanutchat_{prefix}_{token}.png")
+    The output is pure ASCII, so the ASCII decoder is used rather than UTF-8.
+    """
+    return _b64encode(data).decode('ascii')
 
 
 def _sanitize_error_message(error: Exception) -> str:
     """Sanitize error message to prevent leaking sensitive information."""
     error_str = str(error)
     # Remove potential file paths
-    error_str = re.sub(r'/[^\s]+', '[path]', error_str)
+    error_str = _PATH_PATTERN.sub('[path]', error_str)
     # Remove potential URLs with tokens/keys
-    error_str = re.sub(r'https?://[^\s]+', '[url]', error_str)
+    error_str = _URL_PATTERN.sub('[url]', error_str)
     # Truncate to reasonable length
     if len(error_str) > 200:
         error_str = error_str[:200] + "..."
@@ -54,7 +70,102 @@ class ImageGeneratorBackend(ABC):
         pass
 
 
-class TextToImageBackend(GradioAutomation, ImageGeneratorBackend):
+class GradioImageBackend(GradioAutomation, ImageGeneratorBackend):
+    """
+    Shared page flow for the Gradio image backends.
+
+    Each backend's generate() validates its inputs and fills in the space's
+    form; loading the space, starting the run, retrieving and saving the
+    output, and error handling are done once here by _run_pipeline().
+    """
+
+    # Labels of the button that starts a run, highest priority first
+    GENERATE_BUTTONS: Tuple[str, ...] = ("Generate", "Run", "Submit")
+
+    # Prefix for default output filenames and debug screenshots
+    OUTPUT_PREFIX = "image"
+
+    # Whether to try the space's download button when no output image is found
+    DOWNLOAD_FALLBACK = False
+
+    async def _run_pipeline(
+        self,
+        fill_form: Callable[[Page], Awaitable[None]],
+        output_path: Optional[str] = None,
+        return_base64: bool = False,
+        output_stem: Optional[str] = None
+    ) -> dict:
+        """
+        Run one generation on a fresh page.
+
+        Args:
+            fill_form: Fills in the space's inputs on the loaded page
+            output_path: Where to save the image
+            return_base64: Return base64 data instead of saving
+            output_stem: Default filename stem, before the timestamp
+                (defaults to OUTPUT_PREFIX)
+
+        Returns:
+            dict with success status and path/base64/error
+        """
+        async with self.new_page() as page:
+            try:
+                logger.info(f"Loading space: {self.space_url}")
+                await page.goto(self.space_url, wait_until="domcontentloaded")
+                await self.wait_for_gradio_load(page)
+                await self.dismiss_popups(page)
+
+                await fill_form(page)
+
+                # Click generate button
+                logger.info(f"Starting {self.name}...")
+                await self.click_any_button(page, self.GENERATE_BUTTONS)
+
+                # Wait for generation
+                logger.info(f"Waiting for {self.name} to complete...")
+                await self.wait_for_generation(page)
+
+                # Get output image
+                image_data = await self.get_output_image(page)
+                if not image_data:
+                    # Try download button as fallback
+                    if self.DOWNLOAD_FALLBACK and output_path:
+                        result = await self.click_download_button(page, output_path)
+                        if result["success"]:
+                            return result
+                    raise Exception("Could not retrieve generated image")
+
+                # Handle output
+                if return_base64:
+                    return {
+                        "success": True,
+                        "base64": _encode_base64(image_data),
+                        "size_bytes": len(image_data),
+                        "mime_type": "image/png"
+                    }
+
+                # Generate output path if not provided
+                if output_path is None:
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    output_path = f"{output_stem or self.OUTPUT_PREFIX}_{timestamp}.png"
+
+                return await self.save_image(image_data, output_path)
+
+            except Exception as e:
+                # SECURITY: Use secure random path for debug screenshot
+                try:
+                    if not page.is_closed():
+                        screenshot_path = _generate_secure_screenshot_path(self.OUTPUT_PREFIX)
+                        await page.screenshot(path=screenshot_path, timeout=self.DEBUG_SCREENSHOT_TIMEOUT_MS)
+                        logger.debug(f"Debug screenshot saved to: {screenshot_path}")
+                except Exception:
+                    pass
+                # SECURITY: Sanitize error message
+                logger.error(f"{self.name} generation failed: {type(e).__name__}")
+                return {"success": False, "error": _sanitize_error_message(e)}
+
+
+class TextToImageBackend(GradioImageBackend):
     """
     Text-to-Image generation using Hugging Face Spaces.
     
@@ -62,6 +173,10 @@ class TextToImageBackend(GradioAutomation, ImageGeneratorBackend):
     """
     
     name = "text_to_image"
+
+    GENERATE_BUTTONS = ("Generate", "Create", "Run", "Submit", "Dream")
+    OUTPUT_PREFIX = "txt2img"
+    DOWNLOAD_FALLBACK = True
     
     # Space URLs to try in order of preference (using direct .hf.space URLs)
     SPACE_URLS = [
@@ -113,20 +228,11 @@ class TextToImageBackend(GradioAutomation, ImageGeneratorBackend):
         Returns:
             dict with success status and path/base64/error
         """
-        context = await self.new_context()
-        page = await context.new_page()
-        page.set_default_timeout(self.timeout)
-        
-        try:
-            logger.info(f"Loading space: {self.space_url}")
-            await page.goto(self.space_url, wait_until="domcontentloaded")
-            await self.wait_for_gradio_load(page)
-            await self.dismiss_popups(page)
-            
+        async def fill_form(page: Page):
             # Fill in the prompt
             logger.debug("Entering prompt...")
             await self.fill_textbox(page, prompt, index=0)
-            
+        
             # Try to fill negative prompt
             if negative_prompt:
                 try:
@@ -136,85 +242,34 @@ class TextToImageBackend(GradioAutomation, ImageGeneratorBackend):
                         await self.fill_textbox(page, negative_prompt, label="Negative")
                     except Exception:
                         pass
-            
+        
             # Try to set dimensions
             try:
                 await self.set_slider(page, width, label="Width")
                 await self.set_slider(page, height, label="Height")
             except Exception:
                 pass
-            
+        
             # Try to set seed
             if seed is not None:
                 try:
                     await self.fill_textbox(page, str(seed), label="Seed")
                 except Exception:
                     pass
-            
+        
             # Try to set guidance scale
             try:
                 await self.set_slider(page, guidance_scale, label="Guidance")
             except Exception:
                 pass
-            
-            # Click generate button
-            logger.info("Starting generation...")
-            generate_buttons = ["Generate", "Create", "Run", "Submit", "Dream"]
-            for btn_text in generate_buttons:
-                try:
-                    await self.click_button(page, text=btn_text)
-                    break
-                except Exception:
-                    continue
-            
-            # Wait for generation
-            logger.info("Waiting for image generation...")
-            await self.wait_for_generation(page)
-            
-            # Get output image
-            image_data = await self.get_output_image(page)
-            if not image_data:
-                # Try download button as fallback
-                if output_path:
-                    result = await self.click_download_button(page, output_path)
-                    if result["success"]:
-                        return result
-                raise Exception("Could not retrieve generated image")
-            
-            # Handle output
-            if return_base64:
-                return {
-                    "success": True,
-                    "base64": base64.b64encode(image_data).decode('utf-8'),
-                    "size_bytes": len(image_data),
-                    "mime_type": "image/png"
-                }
-            
-            # Generate output path if not provided
-            if output_path is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                safe_prompt = re.sub(r'[^\w]', '_', prompt[:30])
-                output_path = f"txt2img_{safe_prompt}_{timestamp}.png"
-            
-            return await self.save_image(image_data, output_path)
-                
-        except Exception as e:
-            # SECURITY: Use secure random path for debug screenshot
-            try:
-                screenshot_path = _generate_secure_debug_screenshot_path("txt2img")
-                await page.screenshot(path=screenshot_path)
-                logger.debug(f"Debug screenshot saved to: {screenshot_path}")
-            except Exception:
-                pass
-            # SECURITY: Sanitize error message
-            logger.error(f"Text-to-image generation failed: {type(e).__name__}")
-            return {"success": False, "error": _sanitize_error_message(e)}
 
-        finally:
-            await context.close()
+        safe_prompt = re.sub(r'[^\w]', '_', prompt[:30])
+        return await self._run_pipeline(
+            fill_form, output_path, return_base64, output_stem=f"txt2img_{safe_prompt}"
+        )
 
 
-class ImageToImageBackend(GradioAutomation, ImageGeneratorBackend):
+class ImageToImageBackend(GradioImageBackend):
     """
     Image-to-Image generation (variations, style transfer).
     
@@ -222,6 +277,9 @@ class ImageToImageBackend(GradioAutomation, ImageGeneratorBackend):
     """
     
     name = "image_to_image"
+
+    GENERATE_BUTTONS = ("Generate", "Transform", "Run", "Submit")
+    OUTPUT_PREFIX = "img2img"
     
     SPACE_URLS = [
         "https://multimodalart-cosxl.hf.space",  # Primary - most reliable
@@ -262,20 +320,11 @@ class ImageToImageBackend(GradioAutomation, ImageGeneratorBackend):
         if not os.path.exists(image_path):
             return {"success": False, "error": f"Image not found: {image_path}"}
         
-        context = await self.new_context()
-        page = await context.new_page()
-        page.set_default_timeout(self.timeout)
-        
-        try:
-            logger.info(f"Loading space: {self.space_url}")
-            await page.goto(self.space_url, wait_until="domcontentloaded")
-            await self.wait_for_gradio_load(page)
-            await self.dismiss_popups(page)
-            
+        async def fill_form(page: Page):
             # Upload source image
             logger.debug("Uploading source image...")
-            await self.upload_image(page, image_path, index=0)
-            await page.wait_for_timeout(4000)
+            if not await self.upload_image(page, image_path, index=0):
+                await page.wait_for_timeout(4000)  # Preview not seen; allow extra processing time
 
             # Fill prompt
             logger.debug("Entering prompt...")
@@ -287,7 +336,7 @@ class ImageToImageBackend(GradioAutomation, ImageGeneratorBackend):
                     await self.fill_textbox(page, negative_prompt, placeholder="negative")
                 except Exception:
                     pass
-            
+        
             # Set strength
             try:
                 await self.set_slider(page, strength, label="Strength")
@@ -296,62 +345,17 @@ class ImageToImageBackend(GradioAutomation, ImageGeneratorBackend):
                     await self.set_slider(page, strength, label="Denoise")
                 except Exception:
                     pass
-            
+        
             # Set guidance
             try:
                 await self.set_slider(page, guidance_scale, label="Guidance")
             except Exception:
                 pass
-            
-            # Generate
-            logger.info("Starting transformation...")
-            for btn_text in ["Generate", "Transform", "Run", "Submit"]:
-                try:
-                    await self.click_button(page, text=btn_text)
-                    break
-                except Exception:
-                    continue
-            
-            # Wait
-            logger.info("Waiting for image transformation...")
-            await self.wait_for_generation(page)
-            
-            # Get output
-            image_data = await self.get_output_image(page)
-            if not image_data:
-                raise Exception("Could not retrieve transformed image")
-            
-            if return_base64:
-                return {
-                    "success": True,
-                    "base64": base64.b64encode(image_data).decode('utf-8'),
-                    "size_bytes": len(image_data),
-                    "mime_type": "image/png"
-                }
-            
-            if output_path is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_path = f"img2img_{timestamp}.png"
-            
-            return await self.save_image(image_data, output_path)
-                
-        except Exception as e:
-            # SECURITY: Use secure random path for debug screenshot
-            try:
-                screenshot_path = _generate_secure_debug_screenshot_path("img2img")
-                await page.screenshot(path=screenshot_path)
-                logger.debug(f"Debug screenshot saved to: {screenshot_path}")
-            except Exception:
-                pass
-            # SECURITY: Sanitize error message
-            logger.error(f"Image-to-image generation failed: {type(e).__name__}")
-            return {"success": False, "error": _sanitize_error_message(e)}
 
-        finally:
-            await context.close()
+        return await self._run_pipeline(fill_form, output_path, return_base64)
 
 
-class InpaintingBackend(GradioAutomation, ImageGeneratorBackend):
+class InpaintingBackend(GradioImageBackend):
     """
     Inpainting - edit specific regions of an image.
     
@@ -359,6 +363,9 @@ class InpaintingBackend(GradioAutomation, ImageGeneratorBackend):
     """
     
     name = "inpainting"
+
+    GENERATE_BUTTONS = ("Inpaint", "Generate", "Run", "Submit")
+    OUTPUT_PREFIX = "inpaint"
     
     SPACE_URLS = [
         "https://diffusers-stable-diffusion-xl-inpainting.hf.space",
@@ -401,86 +408,32 @@ class InpaintingBackend(GradioAutomation, ImageGeneratorBackend):
         if not os.path.exists(mask_path):
             return {"success": False, "error": f"Mask not found: {mask_path}"}
         
-        context = await self.new_context()
-        page = await context.new_page()
-        page.set_default_timeout(self.timeout)
-        
-        try:
-            logger.info(f"Loading space: {self.space_url}")
-            await page.goto(self.space_url, wait_until="domcontentloaded")
-            await self.wait_for_gradio_load(page)
-            await self.dismiss_popups(page)
-            
+        async def fill_form(page: Page):
             # Upload source image
             logger.debug("Uploading source image...")
-            await self.upload_image(page, image_path, index=0)
-            await page.wait_for_timeout(3000)
+            if not await self.upload_image(page, image_path, index=0):
+                await page.wait_for_timeout(3000)  # Preview not seen; allow extra processing time
 
             # Upload mask
             logger.debug("Uploading mask...")
-            await self.upload_image(page, mask_path, index=1)
-            await page.wait_for_timeout(3000)
-            
+            if not await self.upload_image(page, mask_path, index=1):
+                await page.wait_for_timeout(3000)  # Preview not seen; allow extra processing time
+        
             # Fill prompt
             logger.debug("Entering prompt...")
             await self.fill_textbox(page, prompt, index=0)
-            
+        
             # Negative prompt
             if negative_prompt:
                 try:
                     await self.fill_textbox(page, negative_prompt, placeholder="negative")
                 except Exception:
                     pass
-            
-            # Generate
-            logger.info("Starting inpainting...")
-            for btn_text in ["Inpaint", "Generate", "Run", "Submit"]:
-                try:
-                    await self.click_button(page, text=btn_text)
-                    break
-                except Exception:
-                    continue
-            
-            # Wait
-            logger.info("Waiting for inpainting to complete...")
-            await self.wait_for_generation(page)
-            
-            # Get output
-            image_data = await self.get_output_image(page)
-            if not image_data:
-                raise Exception("Could not retrieve inpainted image")
-            
-            if return_base64:
-                return {
-                    "success": True,
-                    "base64": base64.b64encode(image_data).decode('utf-8'),
-                    "size_bytes": len(image_data),
-                    "mime_type": "image/png"
-                }
-            
-            if output_path is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_path = f"inpaint_{timestamp}.png"
-            
-            return await self.save_image(image_data, output_path)
-                
-        except Exception as e:
-            # SECURITY: Use secure random path for debug screenshot
-            try:
-                screenshot_path = _generate_secure_debug_screenshot_path("inpaint")
-                await page.screenshot(path=screenshot_path)
-                logger.debug(f"Debug screenshot saved to: {screenshot_path}")
-            except Exception:
-                pass
-            # SECURITY: Sanitize error message
-            logger.error(f"Inpainting generation failed: {type(e).__name__}")
-            return {"success": False, "error": _sanitize_error_message(e)}
 
-        finally:
-            await context.close()
+        return await self._run_pipeline(fill_form, output_path, return_base64)
 
 
-class UpscaleBackend(GradioAutomation, ImageGeneratorBackend):
+class UpscaleBackend(GradioImageBackend):
     """
     Image upscaling / enhancement.
     
@@ -488,6 +441,10 @@ class UpscaleBackend(GradioAutomation, ImageGeneratorBackend):
     """
     
     name = "upscale"
+
+    GENERATE_BUTTONS = ("Upscale", "Enhance", "Generate", "Run", "Submit")
+    OUTPUT_PREFIX = "upscale"
+    DOWNLOAD_FALLBACK = True
     
     SPACE_URLS = [
         "https://finegrain-finegrain-image-enhancer.hf.space",
@@ -520,21 +477,12 @@ class UpscaleBackend(GradioAutomation, ImageGeneratorBackend):
         if not os.path.exists(image_path):
             return {"success": False, "error": f"Image not found: {image_path}"}
         
-        context = await self.new_context()
-        page = await context.new_page()
-        page.set_default_timeout(self.timeout)
-        
-        try:
-            logger.info(f"Loading space: {self.space_url}")
-            await page.goto(self.space_url, wait_until="domcontentloaded")
-            await self.wait_for_gradio_load(page)
-            await self.dismiss_popups(page)
-            
+        async def fill_form(page: Page):
             # Upload image
             logger.debug("Uploading image...")
-            await self.upload_image(page, image_path, index=0)
-            await page.wait_for_timeout(4000)
-            
+            if not await self.upload_image(page, image_path, index=0):
+                await page.wait_for_timeout(4000)  # Preview not seen; allow extra processing time
+        
             # Try to set scale
             try:
                 await self.set_slider(page, scale, label="Scale")
@@ -543,57 +491,8 @@ class UpscaleBackend(GradioAutomation, ImageGeneratorBackend):
                     await self.select_dropdown(page, f"{int(scale)}x", label="Scale")
                 except Exception:
                     pass
-            
-            # Generate
-            logger.info("Starting upscale...")
-            for btn_text in ["Upscale", "Enhance", "Generate", "Run", "Submit"]:
-                try:
-                    await self.click_button(page, text=btn_text)
-                    break
-                except Exception:
-                    continue
-            
-            # Wait
-            logger.info("Waiting for upscaling to complete...")
-            await self.wait_for_generation(page)
-            
-            # Get output
-            image_data = await self.get_output_image(page)
-            if not image_data:
-                if output_path:
-                    result = await self.click_download_button(page, output_path)
-                    if result["success"]:
-                        return result
-                raise Exception("Could not retrieve upscaled image")
-            
-            if return_base64:
-                return {
-                    "success": True,
-                    "base64": base64.b64encode(image_data).decode('utf-8'),
-                    "size_bytes": len(image_data),
-                    "mime_type": "image/png"
-                }
-            
-            if output_path is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_path = f"upscale_{timestamp}.png"
-            
-            return await self.save_image(image_data, output_path)
-                
-        except Exception as e:
-            # SECURITY: Use secure random path for debug screenshot
-            try:
-                screenshot_path = _generate_secure_debug_screenshot_path("upscale")
-                await page.screenshot(path=screenshot_path)
-                logger.debug(f"Debug screenshot saved to: {screenshot_path}")
-            except Exception:
-                pass
-            # SECURITY: Sanitize error message
-            logger.error(f"Upscale generation failed: {type(e).__name__}")
-            return {"success": False, "error": _sanitize_error_message(e)}
 
-        finally:
-            await context.close()
+        return await self._run_pipeline(fill_form, output_path, return_base64)
 
 
 class UnifiedImageGenerator:
@@ -605,6 +504,9 @@ class UnifiedImageGenerator:
     - inpaint: Edit specific regions
     - upscale: Enhance resolution
     """
+
+    # Operations run_batch() can dispatch
+    BATCH_OPERATIONS = frozenset({"text_to_image", "image_to_image", "inpaint", "upscale"})
     
     def __init__(
         self,
@@ -629,46 +531,41 @@ class UnifiedImageGenerator:
         self._img2img_url = image_to_image_url
         self._inpaint_url = inpainting_url
         self._upscale_url = upscale_url
+
+        # Serializes lazy backend creation when operations run concurrently
+        self._init_lock = asyncio.Lock()
         
+    async def _get_backend(self, attr: str, backend_cls: type, space_url: Optional[str]):
+        """Return the backend stored in attr, creating and starting it on first use.
+
+        Concurrent callers (see run_batch) share one lock, so each backend is
+        only created and started once.
+        """
+        backend = getattr(self, attr)
+        if backend is None:
+            async with self._init_lock:
+                backend = getattr(self, attr)
+                if backend is None:
+                    backend = backend_cls(
+                        space_url=space_url,
+                        headless=self.headless,
+                        timeout=self.timeout
+                    )
+                    await backend.start()
+                    setattr(self, attr, backend)
+        return backend
+
     async def _get_txt2img(self) -> TextToImageBackend:
-        if self._txt2img is None:
-            self._txt2img = TextToImageBackend(
-                space_url=self._txt2img_url,
-                headless=self.headless,
-                timeout=self.timeout
-            )
-            await self._txt2img.start()
-        return self._txt2img
+        return await self._get_backend("_txt2img", TextToImageBackend, self._txt2img_url)
     
     async def _get_img2img(self) -> ImageToImageBackend:
-        if self._img2img is None:
-            self._img2img = ImageToImageBackend(
-                space_url=self._img2img_url,
-                headless=self.headless,
-                timeout=self.timeout
-            )
-            await self._img2img.start()
-        return self._img2img
+        return await self._get_backend("_img2img", ImageToImageBackend, self._img2img_url)
     
     async def _get_inpaint(self) -> InpaintingBackend:
-        if self._inpaint is None:
-            self._inpaint = InpaintingBackend(
-                space_url=self._inpaint_url,
-                headless=self.headless,
-                timeout=self.timeout
-            )
-            await self._inpaint.start()
-        return self._inpaint
+        return await self._get_backend("_inpaint", InpaintingBackend, self._inpaint_url)
     
     async def _get_upscale(self) -> UpscaleBackend:
-        if self._upscale is None:
-            self._upscale = UpscaleBackend(
-                space_url=self._upscale_url,
-                headless=self.headless,
-                timeout=self.timeout
-            )
-            await self._upscale.start()
-        return self._upscale
+        return await self._get_backend("_upscale", UpscaleBackend, self._upscale_url)
         
     async def close(self):
         """Close all backends."""
@@ -702,6 +599,34 @@ class UnifiedImageGenerator:
         backend = await self._get_upscale()
         return await backend.generate(**kwargs)
 
+    async def run_batch(self, jobs: List[dict]) -> List[dict]:
+        """
+        Run several image operations concurrently.
+
+        Each job gets its own browser context; how many run at once is bounded
+        by the shared page limit in gradio_automation. Jobs waiting for a page
+        are not timed out: each backend applies self.timeout to its own page
+        loads and generation once it has a page.
+
+        Args:
+            jobs: List of {"op": name, "params": {...}} dicts, where op is one of
+                BATCH_OPERATIONS and params are that method's keyword arguments
+
+        Returns:
+            One result dict per job, in the same order as jobs
+        """
+        async def run(job: dict) -> dict:
+            op = job.get("op")
+            if op not in self.BATCH_OPERATIONS:
+                return {"success": False, "error": f"Unknown operation: {op}"}
+            try:
+                return await getattr(self, op)(**job.get("params", {}))
+            except Exception as e:
+                logger.error(f"Batch {op} failed: {type(e).__name__}")
+                return {"success": False, "error": _sanitize_error_message(e)}
+
+        return list(await asyncio.gather(*(run(job) for job in jobs)))
+
 
 # CLI for testing
 async def main():
@@ -784,6 +709,14 @@ async def main():
         return 1
 
 
+async def _run_cli():
+    """Run the CLI, then shut down the shared browser so the process can exit."""
+    try:
+        return await main()
+    finally:
+        await cleanup_shared_browsers()
+
+
 if __name__ == "__main__":
     import sys
-    sys.exit(asyncio.run(main()))
+    sys.exit(asyncio.run(_run_cli()))
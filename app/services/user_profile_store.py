@@ -1,9 +1,10 @@
 """User profile database operations."""
+import copy
 import json
 import logging
 from dataclasses import dataclass, asdict
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from app.services.database import get_database
 
 logger = logging.getLogger(__name__)
@@ -27,6 +28,17 @@ def get_default_profile_template() -> Dict[str, Any]:
     }
 
 
+def _resolve_parent(data: Dict[str, Any], path: str) -> Tuple[Dict[str, Any], str]:
+    """Walk a dot-notation path, creating missing dicts, and return (parent, key)."""
+    parts = path.split(".")
+    parent = data
+    for part in parts[:-1]:
+        if part not in parent:
+            parent[part] = {}
+        parent = parent[part]
+    return parent, parts[-1]
+
+
 @dataclass
 class UserProfile:
     """User profile data structure."""
@@ -186,14 +198,7 @@ class UserProfileStore:
             expected_version = profile.updated_at
 
             # Navigate to parent and get key
-            parts = path.split(".")
-            parent = data
-            for part in parts[:-1]:
-                if part not in parent:
-                    parent[part] = {}
-                parent = parent[part]
-
-            key = parts[-1]
+            parent, key = _resolve_parent(data, path)
             current = parent.get(key)
 
             # Apply operation
@@ -231,6 +236,59 @@ class UserProfileStore:
                     continue
                 raise
 
+    def set_profile_fields(
+        self,
+        user_id: int,
+        updates: Dict[str, Any],
+        profile: Optional[UserProfile] = None,
+        max_retries: int = 3
+    ) -> Optional[UserProfile]:
+        """Set several dot-notation fields in a single write with optimistic locking.
+
+        Equivalent to calling patch_profile_field(path, value, "set") for each
+        entry, but the profile is parsed and serialized once instead of once
+        per field.
+
+        Args:
+            user_id: The user's ID
+            updates: Mapping of dot-notation path to new value
+            profile: Already-loaded profile to base the first attempt on (it is
+                     not modified); reloaded from the database on retry
+            max_retries: Maximum retry attempts on concurrent modification
+
+        Returns:
+            The updated UserProfile, or None if user not found
+
+        Raises:
+            ConcurrentModificationError: If max retries exceeded due to concurrent edits
+        """
+        for attempt in range(max_retries):
+            if profile is None:
+                profile = self.get_profile(user_id)
+                if not profile:
+                    return None
+                data = profile.profile_data
+            else:
+                # Work on a copy so a failed write leaves the caller's profile untouched
+                data = copy.deepcopy(profile.profile_data)
+            expected_version = profile.updated_at
+
+            for path, value in updates.items():
+                parent, key = _resolve_parent(data, path)
+                parent[key] = value
+
+            try:
+                return self.update_profile_data(user_id, data, expected_updated_at=expected_version)
+            except ConcurrentModificationError:
+                if attempt < max_retries - 1:
+                    logger.warning(
+                        f"Concurrent modification detected for user {user_id}, "
+                        f"retrying ({attempt + 1}/{max_retries})"
+                    )
+                    profile = None
+                    continue
+                raise
+
     def delete_profile(self, user_id: int) -> bool:
         """Delete a user's profile."""
         cursor = self.db.execute(
@@ -17,10 +17,14 @@ from pathlib import Path
 from typing import Optional
 from abc import ABC, abstractmethod
 
-from app.services.gradio_automation import GradioAutomation
+from app.services.gradio_automation import GradioAutomation, cleanup_shared_browsers
 
 logger = logging.getLogger(__name__)
 
+# Patterns stripped from error messages before they reach the user
+_PATH_PATTERN = re.compile(r'/\S+')
+_URL_PATTERN = re.compile(r'https?://\S+')
+
 
 def _generate_secure_debug_screenshot_path(prefix: str = "video_error") -> str:
     """Generate a secure, unpredictable path for debug screenshots."""
@@ -33,9 +37,9 @@ def _sanitize_error_message(error: Exception) -> str:
     """Sanitize error message to prevent leaking sensitive information."""
     error_str = str(error)
     # Remove potential file paths
-    error_str = re.sub(r'/[^\s]+', '[path]', error_str)
+    error_str = _PATH_PATTERN.sub('[path]', error_str)
     # Remove potential URLs with tokens/keys
-    error_str = re.sub(r'https?://[^\s]+', '[url]', error_str)
+    error_str = _URL_PATTERN.sub('[url]', error_str)
     # Truncate to reasonable length
     if len(error_str) > 200:
         error_str = error_str[:200] + "..."
@@ -105,99 +109,76 @@ class HuggingFaceImageToVideo(GradioAutomation, VideoGeneratorBackend):
         if not os.path.exists(image_path):
             return {"success": False, "error": f"Image not found: {image_path}"}
         
-        context = await self.new_context()
-        page = await context.new_page()
-        page.set_default_timeout(self.timeout)
-        
-        try:
-            logger.info(f"Loading space: {self.space_url}")
-            await page.goto(self.space_url, wait_until="networkidle")
-            await self.wait_for_gradio_load(page)
+        async with self.new_page() as page:
+            try:
+                logger.info(f"Loading space: {self.space_url}")
+                await page.goto(self.space_url, wait_until="networkidle")
+                await self.wait_for_gradio_load(page)
             
-            # Handle any popups/modals
-            await self._dismiss_popups(page)
+                # Handle any popups/modals
+                await self.dismiss_popups(page)
             
-            # Upload the image
-            logger.debug("Uploading image...")
-            await self.upload_file(page, image_path, index=0)
-            await page.wait_for_timeout(4000)
+                # Upload the image
+                logger.debug("Uploading image...")
+                await self.upload_file(page, image_path, index=0)
+                await page.wait_for_timeout(4000)
             
-            # Fill in prompts if the space supports them
-            if prompt:
-                try:
-                    await self.fill_textbox(page, prompt, index=0)
-                except Exception:
-                    pass  # Prompt field may not exist
+                # Fill in prompts if the space supports them
+                if prompt:
+                    try:
+                        await self.fill_textbox(page, prompt, index=0)
+                    except Exception:
+                        pass  # Prompt field may not exist
                     
-            if negative_prompt:
-                try:
-                    await self.fill_textbox(page, negative_prompt, label="negative")
-                except Exception:
-                    pass
+                if negative_prompt:
+                    try:
+                        await self.fill_textbox(page, negative_prompt, label="negative")
+                    except Exception:
+                        pass
             
-            # Click generate button
-            logger.info("Starting generation...")
-            await self.click_button(page, text="Generate")
+                # Click generate button
+                logger.info("Starting generation...")
+                await self.click_button(page, text="Generate")
             
-            # Wait for generation
-            logger.info("Waiting for video generation (this may take several minutes)...")
-            await self.wait_for_generation(page, timeout=self.timeout)
+                # Wait for generation
+                logger.info("Waiting for video generation (this may take several minutes)...")
+                await self.wait_for_generation(page, timeout=self.timeout)
             
-            # Generate output path if not provided
-            if output_path is None and not return_base64:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_path = f"video_img2vid_{timestamp}.mp4"
+                # Generate output path if not provided
+                if output_path is None and not return_base64:
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    output_path = f"video_img2vid_{timestamp}.mp4"
             
-            if return_base64:
-                # TODO: Implement base64 return for video
-                output_path = f"/tmp/video_temp_{datetime.now().timestamp()}.mp4"
-                result = await self.download_output(page, output_path)
-                if result["success"]:
-                    import base64
-                    video_bytes = Path(output_path).read_bytes()
-                    os.remove(output_path)
-                    return {
-                        "success": True,
-                        "base64": base64.b64encode(video_bytes).decode('utf-8'),
-                        "size_bytes": len(video_bytes),
-                        "mime_type": "video/mp4"
-                    }
-                return result
-            else:
-                return await self.download_output(page, output_path)
+                if return_base64:
+                    # TODO: Implement base64 return for video
+                    output_path = f"/tmp/video_temp_{datetime.now().timestamp()}.mp4"
+                    result = await self.download_output(page, output_path)
+                    if result["success"]:
+                        import base64
+                        video_bytes = Path(output_path).read_bytes()
+                        os.remove(output_path)
+                        return {
+                            "success": True,
+                            "base64": base64.b64encode(video_bytes).decode('utf-8'),
+                            "size_bytes": len(video_bytes),
+                            "mime_type": "video/mp4"
+                        }
+                    return result
+                else:
+                    return await self.download_output(page, output_path)
                 
-        except Exception as e:
-            # SECURITY: Use secure random path for debug screenshot
-            try:
-                screenshot_path = _generate_secure_debug_screenshot_path("img2vid")
-                await page.screenshot(path=screenshot_path)
-                logger.debug(f"Debug screenshot saved to: {screenshot_path}")
-            except Exception:
-                pass
-            # SECURITY: Sanitize error message
-            logger.error(f"Image-to-video generation failed: {type(e).__name__}")
-            return {"success": False, "error": _sanitize_error_message(e)}
-
-        finally:
-            await context.close()
-
-    async def _dismiss_popups(self, page):
-        """Dismiss any cookie banners or popups."""
-        popup_selectors = [
-            "button:has-text('Accept')",
-            "button:has-text('OK')",
-            "button:has-text('Close')",
-            "button:has-text('Got it')",
-            "[aria-label='Close']",
-        ]
-        for selector in popup_selectors:
-            try:
-                btn = page.locator(selector).first
-                if await btn.is_visible(timeout=3000):
-                    await btn.click()
-                    await page.wait_for_timeout(1000)
-            except Exception:
-                pass
+            except Exception as e:
+                # SECURITY: Use secure random path for debug screenshot
+                try:
+                    if not page.is_closed():
+                        screenshot_path = _generate_secure_debug_screenshot_path("img2vid")
+                        await page.screenshot(path=screenshot_path, timeout=self.DEBUG_SCREENSHOT_TIMEOUT_MS)
+                        logger.debug(f"Debug screenshot saved to: {screenshot_path}")
+                except Exception:
+                    pass
+                # SECURITY: Sanitize error message
+                logger.error(f"Image-to-video generation failed: {type(e).__name__}")
+                return {"success": False, "error": _sanitize_error_message(e)}
 
 
 class HuggingFaceTextToVideo(GradioAutomation, VideoGeneratorBackend):
@@ -249,126 +230,103 @@ class HuggingFaceTextToVideo(GradioAutomation, VideoGeneratorBackend):
         Returns:
             dict with success status and path/base64/error
         """
-        context = await self.new_context()
-        page = await context.new_page()
-        page.set_default_timeout(self.timeout)
-        
-        try:
-            logger.info(f"Loading space: {self.space_url}")
-            await page.goto(self.space_url, wait_until="networkidle")
-            await self.wait_for_gradio_load(page)
+        async with self.new_page() as page:
+            try:
+                logger.info(f"Loading space: {self.space_url}")
+                await page.goto(self.space_url, wait_until="networkidle")
+                await self.wait_for_gradio_load(page)
             
-            # Handle any popups
-            await self._dismiss_popups(page)
+                # Handle any popups
+                await self.dismiss_popups(page)
             
-            # Click text-to-video tab if available (LTX-Video has tabs)
-            try:
-                tab = page.locator('button[role="tab"]:has-text("text-to-video")')
-                if await tab.is_visible(timeout=5000):
-                    logger.debug("Clicking text-to-video tab...")
-                    await tab.click(force=True)
-                    await page.wait_for_timeout(3000)
-            except Exception:
-                pass  # Tab may not exist on this space
-
-            # Fill in the prompt
-            logger.debug("Entering prompt...")
-            textarea = page.locator('textarea').first
-            await textarea.fill(prompt)
-
-            # Try to fill negative prompt if field exists
-            if negative_prompt:
+                # Click text-to-video tab if available (LTX-Video has tabs)
                 try:
-                    neg_selectors = [
-                        "textarea[placeholder*='negative']",
-                        "textarea[placeholder*='Negative']",
-                        "textarea:nth-of-type(2)",
-                    ]
-                    for selector in neg_selectors:
-                        elem = page.locator(selector)
-                        if await elem.is_visible(timeout=3000):
-                            await elem.fill(negative_prompt)
-                            break
+                    tab = page.locator('button[role="tab"]:has-text("text-to-video")')
+                    if await tab.is_visible(timeout=5000):
+                        logger.debug("Clicking text-to-video tab...")
+                        await tab.click(force=True)
+                        await page.wait_for_timeout(3000)
                 except Exception:
-                    pass
+                    pass  # Tab may not exist on this space
 
-            # Click generate button
-            logger.info("Starting generation...")
-            generate_selectors = [
-                "button:has-text('Generate Text-to-Video')",
-                "button:has-text('Generate')",
-                "button:has-text('Create')",
-                "button:has-text('Run')",
-                "button.primary",
-            ]
-            for btn_selector in generate_selectors:
-                try:
-                    btn = page.locator(btn_selector).first
-                    if await btn.is_visible(timeout=5000):
-                        await btn.click()
-                        break
-                except Exception:
-                    continue
+                # Fill in the prompt
+                logger.debug("Entering prompt...")
+                textarea = page.locator('textarea').first
+                await textarea.fill(prompt)
+
+                # Try to fill negative prompt if field exists
+                if negative_prompt:
+                    try:
+                        neg_selectors = [
+                            "textarea[placeholder*='negative']",
+                            "textarea[placeholder*='Negative']",
+                            "textarea:nth-of-type(2)",
+                        ]
+                        for selector in neg_selectors:
+                            elem = page.locator(selector)
+                            if await elem.is_visible(timeout=3000):
+                                await elem.fill(negative_prompt)
+                                break
+                    except Exception:
+                        pass
+
+                # Click generate button
+                logger.info("Starting generation...")
+                generate_selectors = [
+                    "button:has-text('Generate Text-to-Video')",
+                    "button:has-text('Generate')",
+                    "button:has-text('Create')",
+                    "button:has-text('Run')",
+                    "button.primary",
+                ]
+                for btn_selector in generate_selectors:
+                    try:
+                        btn = page.locator(btn_selector).first
+                        if await btn.is_visible(timeout=5000):
+                            await btn.click()
+                            break
+                    except Exception:
+                        continue
             
-            # Wait for generation
-            logger.info("Waiting for video generation (this may take several minutes)...")
-            await self.wait_for_generation(page, timeout=self.timeout)
+                # Wait for generation
+                logger.info("Waiting for video generation (this may take several minutes)...")
+                await self.wait_for_generation(page, timeout=self.timeout)
             
-            # Generate output path if not provided
-            if output_path is None and not return_base64:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                safe_prompt = re.sub(r'[^\w]', '_', prompt[:30])
-                output_path = f"video_txt2vid_{safe_prompt}_{timestamp}.mp4"
+                # Generate output path if not provided
+                if output_path is None and not return_base64:
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    safe_prompt = re.sub(r'[^\w]', '_', prompt[:30])
+                    output_path = f"video_txt2vid_{safe_prompt}_{timestamp}.mp4"
             
-            if return_base64:
-                output_path = f"/tmp/video_temp_{datetime.now().timestamp()}.mp4"
-                result = await self.download_output(page, output_path)
-                if result["success"]:
-                    import base64
-                    video_bytes = Path(output_path).read_bytes()
-                    os.remove(output_path)
-                    return {
-                        "success": True,
-                        "base64": base64.b64encode(video_bytes).decode('utf-8'),
-                        "size_bytes": len(video_bytes),
-                        "mime_type": "video/mp4"
-                    }
-                return result
-            else:
-                return await self.download_output(page, output_path)
+                if return_base64:
+                    output_path = f"/tmp/video_temp_{datetime.now().timestamp()}.mp4"
+                    result = await self.download_output(page, output_path)
+                    if result["success"]:
+                        import base64
+                        video_bytes = Path(output_path).read_bytes()
+                        os.remove(output_path)
+                        return {
+                            "success": True,
+                            "base64": base64.b64encode(video_bytes).decode('utf-8'),
+                            "size_bytes": len(video_bytes),
+                            "mime_type": "video/mp4"
+                        }
+                    return result
+                else:
+                    return await self.download_output(page, output_path)
                 
-        except Exception as e:
-            # SECURITY: Use secure random path for debug screenshot
-            try:
-                screenshot_path = _generate_secure_debug_screenshot_path("txt2vid")
-                await page.screenshot(path=screenshot_path)
-                logger.debug(f"Debug screenshot saved to: {screenshot_path}")
-            except Exception:
-                pass
-            # SECURITY: Sanitize error message
-            logger.error(f"Text-to-video generation failed: {type(e).__name__}")
-            return {"success": False, "error": _sanitize_error_message(e)}
-
-        finally:
-            await context.close()
-
-    async def _dismiss_popups(self, page):
-        """Dismiss any cookie banners or popups."""
-        popup_selectors = [
-            "button:has-text('Accept')",
-            "button:has-text('OK')",
-            "button:has-text('Close')",
-            "button:has-text('Got it')",
-            "[aria-label='Close']",
-        ]
-        for selector in popup_selectors:
-            try:
-                btn = page.locator(selector).first
-                if await btn.is_visible(timeout=3000):
-                    await btn.click()
-                    await page.wait_for_timeout(1000)
-            except Exception:
-                pass
+            except Exception as e:
+                # SECURITY: Use secure random path for debug screenshot
+                try:
+                    if not page.is_closed():
+                        screenshot_path = _generate_secure_debug_screenshot_path("txt2vid")
+                        await page.screenshot(path=screenshot_path, timeout=self.DEBUG_SCREENSHOT_TIMEOUT_MS)
+                        logger.debug(f"Debug screenshot saved to: {screenshot_path}")
+                except Exception:
+                    pass
+                # SECURITY: Sanitize error message
+                logger.error(f"Text-to-video generation failed: {type(e).__name__}")
+                return {"success": False, "error": _sanitize_error_message(e)}
 
 
 class VideoGenerator:
@@ -533,6 +491,14 @@ async def main():
         return 1
 
 
+async def _run_cli():
+    """Run the CLI, then shut down the shared browser so the process can exit."""
+    try:
+        return await main()
+    finally:
+        await cleanup_shared_browsers()
+
+
 if __name__ == "__main__":
     import sys
-    sys.exit(asyncio.run(main()))
+    sys.exit(asyncio.run(_run_cli()))
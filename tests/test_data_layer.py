@@ -578,6 +578,78 @@ class TestConcurrentUpdatesOptimisticLocking:
         # All updates should eventually succeed with retries
         assert results["success"] >= 3, f"Expected most updates to succeed, got {results}"
 
+    def test_set_profile_fields_writes_multiple_paths(self, test_db):
+        """set_profile_fields() applies several dot paths in one write."""
+        from app.services.user_profile_store import UserProfileStore
+        store = UserProfileStore()
+
+        user_id = self._create_test_user(test_db)
+        store.create_profile(user_id=user_id)
+
+        result = store.set_profile_fields(user_id, {
+            "identity.name": "Multi",
+            "relationship_metrics.trust_level": 77,
+            "custom_fields.fields.new_key": "created",
+        })
+        assert result is not None
+
+        stored = store.get_profile(user_id).profile_data
+        assert stored["identity"]["name"] == "Multi"
+        assert stored["relationship_metrics"]["trust_level"] == 77
+        assert stored["custom_fields"]["fields"]["new_key"] == "created"
+
+    def test_set_profile_fields_retries_after_conflict(self, test_db):
+        """A stale profile conflicts once, then the write retries on fresh data."""
+        from app.services.user_profile_store import UserProfileStore
+        store = UserProfileStore()
+
+        user_id = self._create_test_user(test_db)
+        store.create_profile(user_id=user_id)
+        stale = store.get_profile(user_id)
+
+        # Another request writes after the stale copy was loaded
+        store.patch_profile_field(user_id, "identity.name", "Concurrent", "set")
+
+        result = store.set_profile_fields(
+            user_id, {"relationship_metrics.trust_level": 42}, profile=stale
+        )
+        assert result is not None
+
+        stored = store.get_profile(user_id).profile_data
+        assert stored["relationship_metrics"]["trust_level"] == 42
+        # The concurrent write was not lost
+        assert stored["identity"]["name"] == "Concurrent"
+        # The caller's profile object was not modified
+        assert "relationship_metrics" not in stale.profile_data
+
+    def test_set_profile_fields_raises_after_max_retries(self, test_db):
+        """ConcurrentModificationError propagates once retries are exhausted."""
+        from app.services.user_profile_store import (
+            UserProfileStore,
+            ConcurrentModificationError
+        )
+        store = UserProfileStore()
+
+        user_id = self._create_test_user(test_db)
+        store.create_profile(user_id=user_id)
+        profile = store.get_profile(user_id)
+        original_data = json.loads(json.dumps(profile.profile_data))
+
+        with patch.object(
+            store, "update_profile_data",
+            side_effect=ConcurrentModificationError("conflict")
+        ) as update:
+            with pytest.raises(ConcurrentModificationError):
+                store.set_profile_fields(
+                    user_id, {"identity.name": "Never Saved"},
+                    profile=profile, max_retries=3
+                )
+        assert update.call_count == 3
+
+        # Neither the caller's profile nor the stored profile changed
+        assert profile.profile_data == original_data
+        assert store.get_profile(user_id).profile_data["identity"].get("name") != "Never Saved"
+
 
 class TestTransactionRollback:
     """Verify transaction rollback on failures."""
@@ -968,3 +1040,94 @@ class TestThreadSafetyConversationStore:
         # Verify data integrity
         for i, msg in enumerate(result.messages):
             assert msg.content == f"message {i}"
+
+
+# =============================================================================
+# Feature Flag Defaults Reload Tests
+# =============================================================================
+
+class TestFeatureDefaultsReload:
+    """Verify the in-process feature default snapshot follows admin changes."""
+
+    TOOLS = [
+        {"type": "function", "function": {"name": "web_search"}},
+        {"type": "function", "function": {"name": "image"}},
+        {"type": "function", "function": {"name": "set_conversation_title"}},
+    ]
+
+    def _create_test_user(self, db, username="featureuser", is_admin=0):
+        """Helper to create a test user."""
+        cursor = db.execute(
+            "INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)",
+            (username, "hash", is_admin)
+        )
+        return cursor.lastrowid
+
+    @pytest.fixture
+    def feature_service(self, test_db, monkeypatch):
+        """Fresh feature and admin service singletons bound to the test database."""
+        import app.services.feature_service as feature_module
+        monkeypatch.setattr(feature_module, "_feature_service", None)
+        try:
+            import app.services.admin_service as admin_module
+            monkeypatch.setattr(admin_module, "_admin_service", None)
+        except ImportError:
+            pass
+        return feature_module.get_feature_service()
+
+    def _tool_names(self, tools):
+        return {tool["function"]["name"] for tool in tools}
+
+    def test_reload_defaults_picks_up_flag_changes(self, test_db, feature_service):
+        """Defaults are snapshotted until reload_defaults() is called."""
+        user_id = self._create_test_user(test_db)
+        assert feature_service.is_feature_enabled("web_search", user_id)
+
+        test_db.execute(
+            "UPDATE feature_flags SET default_enabled = 0 WHERE feature_key = ?",
+            ("web_search",)
+        )
+        # Snapshot is stale until reloaded
+        assert feature_service.is_feature_enabled("web_search", user_id)
+
+        feature_service.reload_defaults()
+        assert not feature_service.is_feature_enabled("web_search", user_id)
+        assert "web_search" not in feature_service.get_enabled_features(user_id)
+
+    def test_admin_update_feature_applies_without_restart(self, test_db, feature_service):
+        """PATCH /api/admin/features/{key} refreshes defaults used for tool gating."""
+        pytest.importorskip("fastapi")
+        pytest.importorskip("jose")
+        from app.routers.admin import update_feature, UpdateFeatureRequest
+        from app.models.auth_schemas import UserResponse
+
+        admin_id = self._create_test_user(test_db, "featureadmin", is_admin=1)
+        user_id = self._create_test_user(test_db)
+        admin = UserResponse(
+            id=admin_id, username="featureadmin", is_admin=True,
+            created_at="2024-01-01T00:00:00"
+        )
+        request = MagicMock()
+        request.headers = {}
+        request.client = None
+
+        # Warm the snapshot before the admin change
+        assert "image" in self._tool_names(
+            feature_service.filter_tools_for_user(self.TOOLS, user_id)
+        )
+
+        asyncio.run(update_feature(
+            request, "image_generation", UpdateFeatureRequest(enabled=False), admin=admin
+        ))
+
+        assert not feature_service.is_feature_enabled("image_generation", user_id)
+        names = self._tool_names(feature_service.filter_tools_for_user(self.TOOLS, user_id))
+        assert "image" not in names
+        assert {"web_search", "set_conversation_title"} <= names
+
+        asyncio.run(update_feature(
+            request, "image_generation", UpdateFeatureRequest(enabled=True), admin=admin
+        ))
+        assert "image" in self._tool_names(
+            feature_service.filter_tools_for_user(self.TOOLS, user_id)
+        )
@@ -0,0 +1,196 @@
+"""
+File Processor Tests
+
+Covers the processed PDF/ZIP result cache and upload validation in
+FileProcessor.
+"""
+import base64
+import io
+import sys
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import app.services.file_processor as file_processor_module
+from app.services.file_processor import FileProcessor
+
+
+def _zip_b64(files):
+    """Build a base64-encoded ZIP archive from a {filename: text} mapping."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for filename, text in files.items():
+            zf.writestr(filename, text)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+@pytest.fixture
+def processor():
+    """A FileProcessor with an empty processed-file cache."""
+    with file_processor_module._processed_cache_lock:
+        file_processor_module._processed_cache.clear()
+    yield FileProcessor()
+    with file_processor_module._processed_cache_lock:
+        file_processor_module._processed_cache.clear()
+
+
+class TestProcessedCache:
+    """Verify PDF/ZIP results are cached by (type, name, digest)."""
+
+    def test_identical_upload_is_served_from_cache(self, processor):
+        """Re-sending the same file skips decoding and extraction."""
+        payload = _zip_b64({"notes.txt": "hello"})
+        file_data = {"name": "a.zip", "type": "zip", "content": payload, "is_base64": True}
+
+        with patch.object(FileProcessor, "_process_zip", wraps=processor._process_zip) as spy:
+            first = processor.process_file(file_data)
+            second = processor.process_file(dict(file_data))
+
+        assert spy.call_count == 1
+        assert first == second
+        assert "hello" in first["content"]
+
+    def test_cache_key_includes_type_name_and_digest(self, processor):
+        """A change to any part of the key is processed separately."""
+        payload = _zip_b64({"notes.txt": "hello"})
+        other_payload = _zip_b64({"notes.txt": "goodbye"})
+
+        with patch.object(FileProcessor, "_process_zip", wraps=processor._process_zip) as zip_spy, \
+                patch.object(FileProcessor, "_process_pdf", return_value={
+                    "name": "a.zip", "type": "pdf", "content": "pdf text", "pages": 1
+                }) as pdf_spy:
+            processor.process_file({"name": "a.zip", "type": "zip", "content": payload})
+            # Same payload under another name
+            renamed = processor.process_file({"name": "b.zip", "type": "zip", "content": payload})
+            # Same name, different payload
+            changed = processor.process_file({"name": "a.zip", "type": "zip", "content": other_payload})
+            # Same name and payload, different type
+            as_pdf = processor.process_file({"name": "a.zip", "type": "pdf", "content": payload})
+
+        assert zip_spy.call_count == 3
+        assert pdf_spy.call_count == 1
+        assert renamed["name"] == "b.zip"
+        assert "goodbye" in changed["content"]
+        assert as_pdf["content"] == "pdf text"
+        assert len(file_processor_module._processed_cache) == 4
+
+    def test_cached_result_is_returned_as_copy(self, processor):
+        """Mutating a returned result does not corrupt later cache hits."""
+        file_data = {"name": "a.zip", "type": "zip", "content": _zip_b64({"notes.txt": "hello"})}
+
+        first = processor.process_file(file_data)
+        original_content = first["content"]
+        first["content"] = "tampered"
+        first["extra"] = True
+
+        second = processor.process_file(file_data)
+        assert second["content"] == original_content
+        assert "extra" not in second
+        assert second is not first
+
+    def test_error_results_are_not_cached(self, processor):
+        """A failed upload is processed again when it is retried."""
+        # Valid base64 that is not a ZIP archive
+        file_data = {
+            "name": "broken.zip",
+            "type": "zip",
+            "content": base64.b64encode(b"not a zip archive").decode("ascii"),
+        }
+
+        with patch.object(FileProcessor, "_process_zip", wraps=processor._process_zip) as spy:
+            first = processor.process_file(file_data)
+            second = processor.process_file(file_data)
+
+        assert "error" in first
+        assert first["content"].startswith("[Error reading ZIP:")
+        assert "error" in second
+        assert spy.call_count == 2
+        assert len(file_processor_module._processed_cache) == 0
+
+    def test_invalid_base64_is_not_cached(self, processor):
+        """Encoding errors are returned without populating the cache."""
+        result = processor.process_file({"name": "bad.zip", "type": "zip", "content": "!!!not base64!!!"})
+
+        assert result["error"] == "Invalid file encoding"
+        assert len(file_processor_module._processed_cache) == 0
+
+
+class TestUploadSizeLimit:
+    """Verify oversized base64 uploads are rejected before decoding."""
+
+    def _oversized_payload(self):
+        # Just past MAX_DECODED_SIZE once decoded (3 bytes per 4 chars)
+        return "A" * ((FileProcessor.MAX_DECODED_SIZE // 3 + 1) * 4)
+
+    @pytest.mark.parametrize("file_type", ["pdf", "zip"])
+    def test_oversized_payload_rejected_before_decoding(self, processor, file_type):
+        """The size check runs before hashing, decoding or parsing."""
+        payload = self._oversized_payload()
+
+        with patch.object(file_processor_module, "_b64decode") as decode, \
+                patch.object(file_processor_module, "_payload_digest") as digest:
+            result = processor.process_file({
+                "name": f"huge.{file_type}", "type": file_type,
+                "content": payload, "is_base64": True,
+            })
+
+        decode.assert_not_called()
+        digest.assert_not_called()
+        assert result == {
+            "name": f"huge.{file_type}",
+            "type": file_type,
+            "error": "File too large",
+            "content": "[Error: File exceeds the 64 MB limit.]",
+        }
+        assert len(file_processor_module._processed_cache) == 0
+
+    def test_payload_at_limit_is_processed(self, processor):
+        """Uploads within the limit still reach the decoder."""
+        payload = _zip_b64({"notes.txt": "hello"})
+
+        with patch.object(FileProcessor, "MAX_DECODED_SIZE", len(payload) * 3 // 4):
+            result = processor.process_file({"name": "a.zip", "type": "zip", "content": payload})
+
+        assert "error" not in result
+        assert "hello" in result["content"]
+
+
+class TestZipMemberTruncation:
+    """Verify bounded ZIP member reads give the same text as a full read."""
+
+    def _member_text(self, processor, data):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            zf.writestr("data.txt", data)
+        payload = base64.b64encode(buffer.getvalue()).decode("ascii")
+        result = processor.process_file({"name": "a.zip", "type": "zip", "content": payload})
+        return result["content"].split("=== data.txt ===\n", 1)[1]
+
+    def _expected(self, data):
+        """The text an unbounded read, decode and truncate would produce."""
+        text = data.decode("utf-8", errors="ignore")
+        if len(text) > FileProcessor.MAX_ZIP_MEMBER_CHARS:
+            return text[:FileProcessor.MAX_ZIP_MEMBER_CHARS] + "\n[... truncated ...]"
+        return text
+
+    @pytest.mark.parametrize("data", [
+        b"a" * 50000,
+        "\U0001F600".encode("utf-8") * 12000,
+        b"short member",
+    ])
+    def test_valid_utf8_matches_full_read(self, processor, data):
+        assert self._member_text(processor, data) == self._expected(data)
+
+    @pytest.mark.parametrize("data", [
+        # Invalid bytes dropped by the decoder push the cut past the bounded read
+        b"\xff" * 39000 + b"b" * 20000,
+        # Mostly invalid, so the full text is under the limit and not truncated
+        b"\xff" * 45000 + b"c" * 500,
+    ])
+    def test_invalid_bytes_match_full_read(self, processor, data):
+        assert self._member_text(processor, data) == self._expected(data)
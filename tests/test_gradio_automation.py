@@ -0,0 +1,352 @@
+"""
+Gradio Automation Tests
+
+Covers output path validation, the checks save_image() runs before writing
+generated images, and how buttons and dropdown options are located. These
+run without a browser, against a fake page, but need Playwright importable.
+"""
+import asyncio
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("playwright")
+
+import app.services.gradio_automation as ga
+from app.services.gradio_automation import _is_path_safe
+
+
+def _matches(expected, actual):
+    """Playwright text matching: case-insensitive substring, or regex search."""
+    if actual is None:
+        return False
+    if isinstance(expected, re.Pattern):
+        return expected.search(actual) is not None
+    return expected.lower() in actual.lower()
+
+
+class FakeElement:
+    """An element with an optional ARIA role/name and a CSS tag/class."""
+
+    def __init__(self, css, text, role=None, name=None):
+        self.css = css
+        self.text = text
+        self.role = role
+        self.name = name if name is not None else text
+
+
+class FakeLocator:
+    """The subset of Playwright's Locator used by GradioAutomation."""
+
+    def __init__(self, page, elements):
+        self.page = page
+        self.elements = elements
+
+    @property
+    def first(self):
+        return FakeLocator(self.page, self.elements[:1])
+
+    def nth(self, index):
+        return FakeLocator(self.page, self.elements[index:index + 1])
+
+    def or_(self, other):
+        merged = set(self.elements) | set(other.elements)
+        return FakeLocator(self.page, [el for el in self.page.elements if el in merged])
+
+    async def count(self):
+        return len(self.elements)
+
+    async def wait_for(self, state="visible", timeout=None):
+        self.page.wait_timeouts.append(timeout)
+        if not self.elements:
+            raise TimeoutError("locator matched nothing")
+
+    async def select_option(self, value=None, timeout=None):
+        # Gradio's custom dropdowns are not native <select> elements
+        raise TimeoutError("not a <select> element")
+
+    async def click(self, timeout=None):
+        if not self.elements:
+            raise TimeoutError("locator matched nothing")
+        self.page.clicked.append(self.elements[0])
+
+
+class FakePage:
+    """A page holding FakeElements in document order."""
+
+    def __init__(self, *elements):
+        self.elements = list(elements)
+        self.clicked = []
+        self.wait_timeouts = []
+
+    def get_by_role(self, role, name=None):
+        return FakeLocator(self, [
+            el for el in self.elements
+            if el.role == role and (name is None or _matches(name, el.name))
+        ])
+
+    def locator(self, selector, has_text=None):
+        return FakeLocator(self, [
+            el for el in self.elements
+            if el.css == selector and (has_text is None or _matches(has_text, el.text))
+        ])
+
+
+class TestIsPathSafe:
+    """Verify _is_path_safe() rejects paths that could escape the allowed dirs."""
+
+    def test_path_inside_allowed_dir_is_safe(self, tmp_path):
+        """A plain file inside an allowed directory passes."""
+        target = tmp_path / "out.png"
+
+        is_safe, error, abs_path = _is_path_safe(str(target), [tmp_path])
+
+        assert is_safe, error
+        assert abs_path == str(target)
+
+    def test_traversal_rejected(self, tmp_path):
+        """Any '..' component is rejected, even if it normalizes inside."""
+        (tmp_path / "sub").mkdir()
+
+        for path in (
+            f"{tmp_path}/sub/../out.png",
+            f"{tmp_path}/../etc/passwd",
+            "../out.png",
+        ):
+            is_safe, error, abs_path = _is_path_safe(path, [tmp_path])
+            assert not is_safe, path
+            assert error == "Path traversal (..) not allowed"
+            assert abs_path is None
+
+    def test_sibling_prefix_rejected(self, tmp_path):
+        """An allowed dir that is a string prefix of a sibling does not admit it."""
+        allowed = tmp_path / "f"
+        sibling = tmp_path / "foo"
+
+        is_safe, error, abs_path = _is_path_safe(str(sibling / "out.png"), [allowed])
+        assert not is_safe
+        assert error == "Path must be within allowed directories"
+        assert abs_path is None
+
+        is_safe, _, _ = _is_path_safe(str(allowed / "out.png"), [allowed])
+        assert is_safe
+
+    def test_symlink_leaf_rejected(self, tmp_path):
+        """A path that is itself a symlink is rejected, wherever it points."""
+        target = tmp_path / "real.png"
+        target.write_bytes(b"png")
+        link = tmp_path / "link.png"
+        link.symlink_to(target)
+
+        is_safe, error, abs_path = _is_path_safe(str(link), [tmp_path])
+
+        assert not is_safe
+        assert error == "Symlinks not allowed"
+        assert abs_path is None
+
+    def test_relative_path_resolves_to_absolute(self, tmp_path, monkeypatch):
+        """Relative paths are checked and returned as absolute paths."""
+        monkeypatch.chdir(tmp_path)
+
+        is_safe, error, abs_path = _is_path_safe("images/out.png", [tmp_path])
+
+        assert is_safe, error
+        assert os.path.isabs(abs_path)
+        assert abs_path == str(tmp_path / "images" / "out.png")
+
+    def test_relative_path_outside_allowed_dir_rejected(self, tmp_path, monkeypatch):
+        """A relative path is judged by where it resolves, not how it is spelled."""
+        allowed = tmp_path / "allowed"
+        allowed.mkdir()
+        monkeypatch.chdir(tmp_path)
+
+        is_safe, error, _ = _is_path_safe("out.png", [allowed])
+
+        assert not is_safe
+        assert error == "Path must be within allowed directories"
+
+
+class TestSaveImage:
+    """Verify save_image() confirms where the write lands on disk."""
+
+    @pytest.fixture
+    def dirs(self, tmp_path, monkeypatch):
+        """An allowed output dir and an outside dir, with fresh save caches."""
+        allowed = tmp_path / "allowed"
+        outside = tmp_path / "outside"
+        allowed.mkdir()
+        outside.mkdir()
+        monkeypatch.setattr(ga, "_ALLOWED_OUTPUT_PREFIXES", ga._dir_prefixes([allowed]))
+        monkeypatch.setattr(ga, "_ALLOWED_OUTPUT_REAL_PREFIXES", ga._dir_prefixes([allowed], resolve=True))
+        ga._verified_output_dirs.clear()
+        yield allowed, outside
+        ga._verified_output_dirs.clear()
+
+    @pytest.fixture
+    def automation(self):
+        return ga.GradioAutomation("http://localhost:7860")
+
+    def test_symlinked_parent_outside_allowed_dirs_rejected(self, dirs, automation):
+        """A parent dir symlinked outside passes the lexical check but not realpath."""
+        allowed, outside = dirs
+        (allowed / "link").symlink_to(outside, target_is_directory=True)
+
+        result = asyncio.run(automation.save_image(b"png", str(allowed / "link" / "out.png")))
+
+        assert result["success"] is False
+        assert result["error"] == "Invalid output path: Path must be within allowed directories"
+        assert list(outside.iterdir()) == []
+
+    def test_output_dir_deleted_between_saves(self, dirs, automation):
+        """A verified dir removed later is recreated and the save still succeeds."""
+        allowed, _ = dirs
+        out_dir = allowed / "images"
+
+        first = asyncio.run(automation.save_image(b"one", str(out_dir / "a.png")))
+        assert first["success"] is True
+        assert str(out_dir) in ga._verified_output_dirs
+
+        shutil.rmtree(out_dir)
+
+        # The cached entry skips the exists() check; the failed write recreates the dir
+        second = asyncio.run(automation.save_image(b"two", str(out_dir / "b.png")))
+        assert second["success"] is True
+        assert (out_dir / "b.png").read_bytes() == b"two"
+        assert str(out_dir) in ga._verified_output_dirs
+
+    def test_deleted_output_dir_replaced_by_outside_symlink(self, dirs, automation):
+        """A deleted dir swapped for a link outside is still rejected."""
+        allowed, outside = dirs
+        out_dir = allowed / "images"
+
+        first = asyncio.run(automation.save_image(b"one", str(out_dir / "a.png")))
+        assert first["success"] is True
+
+        # Replace the verified dir with a dangling link to a dir outside
+        shutil.rmtree(out_dir)
+        out_dir.symlink_to(outside / "missing", target_is_directory=True)
+
+        second = asyncio.run(automation.save_image(b"two", str(out_dir / "b.png")))
+        assert second["success"] is False
+        assert list(outside.iterdir()) == []
+
+
+class TestLocatorPreference:
+    """Verify role locators are preferred over CSS fallbacks, not page order."""
+
+    @pytest.fixture
+    def automation(self):
+        return ga.GradioAutomation("http://localhost:7860")
+
+    def test_click_button_prefers_role_match_over_earlier_css_match(self, automation):
+        """A role match wins even when a CSS-only match comes first on the page."""
+        # Visible text matches, but the accessible name (aria-label) does not
+        css_only = FakeElement("button", "Generate", role="button", name="Close")
+        by_role = FakeElement("div", "Generate", role="button")
+        page = FakePage(css_only, by_role)
+
+        asyncio.run(automation.click_button(page, text="Generate"))
+
+        assert page.clicked == [by_role]
+
+    def test_click_button_falls_back_to_css_match(self, automation):
+        """With no role match, the plain <button> text match is clicked."""
+        css_only = FakeElement("button", "Generate", role="button", name="Close")
+        page = FakePage(FakeElement("button", "Other", role="button"), css_only)
+
+        asyncio.run(automation.click_button(page, text="Generate"))
+
+        assert page.clicked == [css_only]
+
+    def test_select_dropdown_prefers_option_role(self, automation):
+        """A role=option match wins over an earlier .dropdown-item."""
+        dropdown = FakeElement(ga._DROPDOWN_SELECTOR, "", role="listbox")
+        item = FakeElement(".dropdown-item", "2x")
+        option = FakeElement("li", "2x", role="option")
+        page = FakePage(dropdown, item, option)
+
+        asyncio.run(automation.select_dropdown(page, "2x"))
+
+        assert page.clicked == [dropdown, option]
+
+    def test_select_dropdown_falls_back_to_dropdown_item(self, automation):
+        """Without role=option elements, the .dropdown-item match is clicked."""
+        dropdown = FakeElement(ga._DROPDOWN_SELECTOR, "", role="listbox")
+        item = FakeElement(".dropdown-item", "2x")
+        page = FakePage(dropdown, item)
+
+        asyncio.run(automation.select_dropdown(page, "2x"))
+
+        assert page.clicked == [dropdown, item]
+
+    def test_click_any_button_follows_priority_order(self, automation):
+        """The first text in the list wins, not the first button on the page."""
+        submit = FakeElement("button", "Submit", role="button")
+        run = FakeElement("button", "Run", role="button")
+        generate = FakeElement("button", "Generate", role="button")
+        page = FakePage(submit, run, generate)
+
+        clicked = asyncio.run(automation.click_any_button(page, ("Generate", "Run", "Submit")))
+
+        assert clicked == "Generate"
+        assert page.clicked == [generate]
+
+    def test_click_any_button_prefers_whole_labels(self, automation):
+        """A whole-label match beats an earlier-priority text found only inside a label."""
+        page = FakePage(
+            FakeElement("button", "Submit feedback", role="button"),
+            FakeElement("button", " 🎨 generate! ", role="button"),
+        )
+
+        clicked = asyncio.run(automation.click_any_button(page, ("Submit", "Generate")))
+
+        assert clicked == "Generate"
+        assert page.clicked == [page.elements[1]]
+
+    def test_click_any_button_matches_substring_labels(self, automation):
+        """Without a whole-label match, labels containing a text match in priority order."""
+        run = FakeElement("button", "Run inference", role="button")
+        generate = FakeElement("button", "Generate Image", role="button")
+        page = FakePage(run, generate)
+
+        clicked = asyncio.run(automation.click_any_button(page, ("Generate", "Run")))
+
+        assert clicked == "Generate"
+        assert page.clicked == [generate]
+
+    def test_click_any_button_skips_busy_labels(self, automation):
+        """Labels where the text is only part of a word, like "Running...", don't match."""
+        enhance = FakeElement("button", "Enhance Image", role="button")
+        page = FakePage(
+            FakeElement("button", "Running...", role="button"),
+            FakeElement("button", "Generating...", role="button"),
+            enhance,
+        )
+
+        clicked = asyncio.run(automation.click_any_button(page, ("Run", "Generate", "Enhance")))
+
+        assert clicked == "Enhance"
+        assert page.clicked == [enhance]
+
+    def test_click_any_button_waits_with_short_timeout(self, automation):
+        """The wait for a button uses its own timeout, not the page default."""
+        page = FakePage(FakeElement("button", "Generate", role="button"))
+
+        asyncio.run(automation.click_any_button(page, ("Generate",)))
+
+        assert page.wait_timeouts == [automation.BUTTON_WAIT_TIMEOUT_MS]
+
+    def test_click_any_button_raises_when_nothing_matches(self, automation):
+        """A missing generate button is reported rather than ignored."""
+        page = FakePage(FakeElement("button", "Running...", role="button"))
+
+        with pytest.raises(Exception):
+            asyncio.run(automation.click_any_button(page, ("Run", "Generate")))
+        assert page.clicked == []
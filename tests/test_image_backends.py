@@ -0,0 +1,120 @@
+"""
+Image Backend Tests
+
+Covers UnifiedImageGenerator.run_batch() and lazy backend creation, using
+stub backends in place of browser-driven ones. Needs Playwright importable.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("playwright")
+
+from app.services.image_backends import TextToImageBackend, UnifiedImageGenerator
+
+
+class StubBackend:
+    """Stands in for a Gradio backend: sleeps, then returns or raises."""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+
+    async def generate(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {"success": True, "params": kwargs}
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def generator():
+    return UnifiedImageGenerator(timeout=1000)
+
+
+class TestRunBatch:
+    """Verify run_batch() dispatches jobs concurrently and reports each result."""
+
+    def test_results_keep_job_order(self, generator):
+        """Results line up with jobs even when later jobs finish first."""
+        generator._txt2img = StubBackend(delay=0.05)
+        generator._upscale = StubBackend(delay=0.0)
+        jobs = [
+            {"op": "text_to_image", "params": {"prompt": "slow"}},
+            {"op": "upscale", "params": {"image_path": "fast.png"}},
+            {"op": "text_to_image", "params": {"prompt": "also slow"}},
+        ]
+
+        results = asyncio.run(generator.run_batch(jobs))
+
+        assert [r["params"] for r in results] == [job["params"] for job in jobs]
+
+    def test_unknown_operation(self, generator):
+        """Ops outside BATCH_OPERATIONS fail without touching a backend."""
+        generator._txt2img = StubBackend()
+
+        results = asyncio.run(generator.run_batch([
+            {"op": "close", "params": {}},
+            {"op": "text_to_image", "params": {"prompt": "ok"}},
+        ]))
+
+        assert results[0] == {"success": False, "error": "Unknown operation: close"}
+        assert results[1]["success"] is True
+
+    def test_exception_is_reported_per_job(self, generator):
+        """One failing job does not affect the others, and its error is sanitized."""
+        generator._inpaint = StubBackend(error=ValueError("bad mask at /home/user/mask.png"))
+        generator._txt2img = StubBackend()
+
+        results = asyncio.run(generator.run_batch([
+            {"op": "inpaint", "params": {}},
+            {"op": "text_to_image", "params": {"prompt": "ok"}},
+        ]))
+
+        assert results[0] == {"success": False, "error": "bad mask at [path]"}
+        assert results[1]["success"] is True
+
+    def test_slow_job_is_not_cancelled(self, generator):
+        """Time spent queued for a page does not count against the job."""
+        generator.timeout = 10
+        generator._txt2img = StubBackend(delay=0.05)
+
+        results = asyncio.run(generator.run_batch([{"op": "text_to_image", "params": {}}]))
+
+        assert results[0]["success"] is True
+
+
+class TestLazyBackendInit:
+    """Verify concurrent operations create and start each backend once."""
+
+    def test_concurrent_first_use_starts_backend_once(self, generator, monkeypatch):
+        """Jobs racing to use a new backend wait for the one start() call."""
+        starts = []
+
+        async def start(self):
+            starts.append(self)
+            await asyncio.sleep(0.01)
+            self.started = True
+
+        async def generate(self, **kwargs):
+            # No job may use the backend before start() has finished
+            return {"success": getattr(self, "started", False)}
+
+        monkeypatch.setattr(TextToImageBackend, "start", start)
+        monkeypatch.setattr(TextToImageBackend, "generate", generate)
+
+        results = asyncio.run(generator.run_batch(
+            [{"op": "text_to_image", "params": {}}] * 4
+        ))
+
+        assert all(r["success"] for r in results)
+        assert len(starts) == 1
+        assert generator._txt2img is starts[0]